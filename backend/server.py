@@ -1,31 +1,85 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse, ORJSONResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import List, Optional, Dict, Any, AsyncIterator, NamedTuple, Iterable, Callable, Union
 import uuid
 from datetime import datetime, timedelta
 import secrets
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import asyncio
+import numpy as np
+import pandas as pd
 from authlib.integrations.starlette_client import OAuth
+import hashlib
 import json
+import zlib
+import math
+import re
+import time
+import base64
+import sys
+from functools import lru_cache
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+import httpx
+import orjson
+from collections import OrderedDict, deque
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+def env_flag(name: str, default: bool = False) -> bool:
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Indexes backing every query shape the routes issue
+DB_INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("session_token", ASCENDING)], name="session_token"),
+    ],
+    "chat_sessions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_updated_at_id"
+        ),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "chat_messages": [
+        IndexModel(
+            [("session_id", ASCENDING), ("user_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)],
+            name="session_id_user_id_timestamp_id"
+        ),
+        IndexModel([("user_id", ASCENDING), ("timestamp", ASCENDING)], name="user_id_timestamp"),
+    ],
+    "chat_archives": [
+        IndexModel(
+            [("session_id", ASCENDING), ("user_id", ASCENDING), ("first_timestamp", ASCENDING), ("first_id", ASCENDING)],
+            name="session_id_user_id_first", unique=True
+        ),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+}
+
 # Create the main app
-app = FastAPI(title="Vimukti - Mental Wellness Platform")
+# orjson serializes datetimes natively (ISO 8601) and is several times faster than the stdlib encoder
+app = FastAPI(title="Vimukti - Mental Wellness Platform", default_response_class=ORJSONResponse)
 
 # Add session middleware
 app.add_middleware(SessionMiddleware, secret_key=os.environ.get('SECRET_KEY', secrets.token_hex(32)))
@@ -46,6 +100,16 @@ oauth.register(
 )
 
 # Enhanced Models
+# Compiled from onboarding data and stored on the user; bump PERSONALIZATION_VERSION when the
+# compiled text changes so the startup backfill recompiles existing users
+PERSONALIZATION_VERSION = 1
+
+class Personalization(BaseModel):
+    version: int
+    age_bucket: Optional[str] = None
+    block: str
+    compiled_at: datetime = Field(default_factory=datetime.utcnow)
+
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     email: str
@@ -57,6 +121,7 @@ class User(BaseModel):
     personality_type: Optional[str] = None  # MBTI
     personality_archetype: Optional[str] = None
     onboarding_completed: bool = False
+    personalization: Optional[Personalization] = None
     session_token: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -65,6 +130,8 @@ class ChatSession(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     title: Optional[str] = None
+    summary: Optional[str] = None  # rolling summary of turns older than the context window
+    summary_cursor: Optional[str] = None  # keyset cursor of the last message folded into summary
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -77,11 +144,39 @@ class ChatMessage(BaseModel):
     emotion_detected: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+# Onboarding response keys -> user fields
+ONBOARDING_FIELDS = {
+    "name": "name",
+    "age": "age",
+    "zodiacSign": "zodiac_sign",
+    "profession": "profession",
+    "mbtiType": "personality_type",
+}
+
+# Profile answers are text; numbers (an age sent as 29) become strings and anything else is unusable
+def profile_text(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
 class OnboardingResponse(BaseModel):
     user_id: str
     responses: Dict[str, Any]
     personality_archetype: str
 
+    # Only the optional fields may be cleared with null
+    @field_validator("responses")
+    @classmethod
+    def check_profile_answers(cls, responses: Dict[str, Any]) -> Dict[str, Any]:
+        for key in ONBOARDING_FIELDS.keys() & responses.keys():
+            text = profile_text(responses[key])
+            if text is None and (responses[key] is not None or key == "name"):
+                raise ValueError(f"{key} must be a string")
+            responses[key] = text
+        return responses
+
 class ChatRequest(BaseModel):
     session_id: str
     message: str
@@ -91,28 +186,404 @@ class ChatResponse(BaseModel):
     emotion_detected: Optional[str] = None
     session_id: str
 
+# Slim read models for list views; each has a matching Mongo projection below
+class ChatSessionListItem(BaseModel):
+    id: str
+    title: Optional[str] = None
+    updated_at: datetime
+
+class ChatMessageView(BaseModel):
+    id: str
+    session_id: str
+    content: str
+    role: str
+    emotion_detected: Optional[str] = None
+    timestamp: datetime
+
+class ChatSessionPage(BaseModel):
+    items: List[ChatSessionListItem]
+    next_cursor: Optional[str] = None
+
+class ChatMessagePage(BaseModel):
+    items: List[ChatMessageView]
+    next_cursor: Optional[str] = None
+
+USER_PROJECTION = {"_id": 0, "session_token": 0}
+SESSION_LIST_PROJECTION = {"_id": 0, "id": 1, "title": 1, "updated_at": 1}
+MESSAGE_VIEW_PROJECTION = {"_id": 0, "user_id": 0}
+
 class LoginResponse(BaseModel):
     user: User
     session_token: str
 
+# Bounded in-process cache with LRU eviction and per-entry TTL
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        self._store(key, value, time.monotonic() + (self.ttl if ttl is None else ttl))
+
+    def incr(self, key, ttl: Optional[float] = None) -> int:
+        """Add one to a counter, keeping its expiry; a missing or expired counter restarts at 1."""
+        entry = self._data.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return self._store(key, 1, time.monotonic() + (self.ttl if ttl is None else ttl))
+        return self._store(key, entry[0] + 1, entry[1])
+
+    def _store(self, key, value, expires_at: float):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+# Shared cache tier. Auth lookups, the response cache and rate-limit counters go through a
+# CacheBackend: in-process by default, or Redis (REDIS_URL) so several workers and nodes share it.
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter, starting a new one that expires after `ttl` if absent."""
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+# A TTLCache behind the async interface, with each entry's TTL set by the caller
+class InProcessCacheBackend(CacheBackend):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str):
+        self._cache.pop(key)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        return self._cache.incr(key, ttl=ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._cache), "maxsize": self.maxsize}
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, client, prefix: str):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str) -> "RedisCacheBackend":
+        import redis.asyncio as redis
+        return cls(redis.from_url(url), prefix)
+
+    # A cache outage degrades to misses rather than failing requests
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.client.get(f"{self.prefix}:{key}")
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Redis get failed: {str(e)}")
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        try:
+            await self.client.set(f"{self.prefix}:{key}", value, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Redis set failed: {str(e)}")
+
+    async def delete(self, key: str):
+        try:
+            await self.client.delete(f"{self.prefix}:{key}")
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Redis delete failed: {str(e)}")
+
+    async def incr(self, key: str, ttl: float) -> int:
+        # SET NX creates the counter with its expiry; INCR keeps the TTL
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(f"{self.prefix}:{key}", 0, nx=True, px=max(1, int(ttl * 1000)))
+                pipe.incr(f"{self.prefix}:{key}")
+                _, value = await pipe.execute()
+            return value
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Redis incr failed: {str(e)}")
+            return 0
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"errors": self.errors}
+
+# With REDIS_URL every namespace shares one Redis client. In process, each namespace gets its own
+# LRU, so a burst of one kind of entry (rate counters, say) cannot evict cached users.
+redis_cache_backend: Optional[RedisCacheBackend] = (
+    RedisCacheBackend.from_url(os.environ['REDIS_URL'], os.environ.get('REDIS_KEY_PREFIX', 'vimukti'))
+    if os.environ.get('REDIS_URL') else None
+)
+
+def create_cache_backend(maxsize: int) -> CacheBackend:
+    if redis_cache_backend is not None:
+        return redis_cache_backend
+    return InProcessCacheBackend(maxsize=maxsize)
+
+# One key space and TTL within the backend, with its own hit/miss counters
+class CacheNamespace:
+    def __init__(self, backend: CacheBackend, name: str, ttl: float):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.backend.get(f"{self.name}:{key}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        await self.backend.set(f"{self.name}:{key}", value, self.ttl if ttl is None else ttl)
+
+    async def delete(self, key: str):
+        await self.backend.delete(f"{self.name}:{key}")
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        return await self.backend.incr(f"{self.name}:{key}", self.ttl if ttl is None else ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend": self.backend.stats(),
+        }
+
+# Prometheus-style histogram; label values identify one series
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        bucket_counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                bucket_counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in self._series.items():
+            labels = ",".join(f'{name}="{value}"' for name, value in key)
+            prefix = labels + "," if labels else ""
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_DURATION = Histogram(
+    "vimukti_http_request_duration_seconds", "Time until the response is fully sent, by route", LATENCY_BUCKETS
+)
+STAGE_DURATION = Histogram(
+    "vimukti_stage_duration_seconds", "Duration of individual request pipeline stages", LATENCY_BUCKETS
+)
+
+# Stage timings of the current request, surfaced in its Server-Timing header
+_request_timings: ContextVar[Optional[list]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def timed_stage(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+async def timed_call(stage: str, awaitable):
+    with timed_stage(stage):
+        return await awaitable
+
+# Pure ASGI middleware so streaming responses pass through untouched
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        timings: list = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                entries = [f"{stage};dur={elapsed * 1000:.2f}" for stage, elapsed in timings]
+                entries.append(f"app;dur={(time.perf_counter() - start) * 1000:.2f}")
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", ", ".join(entries).encode())
+                ]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code)
+            )
+
+# Flatten nested stats dicts into Prometheus gauges
+def render_gauges(prefix: str, stats: Dict[str, Any]) -> List[str]:
+    lines = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            lines.extend(render_gauges(name, value))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name} {value}")
+    return lines
+
+# Session token -> User cache so authenticated routes skip the users lookup
+user_cache = CacheNamespace(
+    create_cache_backend(maxsize=int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000))),
+    "auth",
+    ttl=float(os.environ.get('AUTH_CACHE_TTL_SECONDS', 60))
+)
+
+# Keyed by a hash of the token, so listing the shared cache's keys reveals no live sessions
+def auth_cache_key(session_token: str) -> str:
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+def get_bearer_token(request: Request) -> Optional[str]:
+    session_token = request.headers.get('Authorization')
+    if not session_token:
+        return None
+    return session_token.replace('Bearer ', '')
+
+# Users are only written by this app (User.dict() in Mongo, the same document as JSON in the auth
+# cache), so they are rebuilt without re-validation; cached JSON just needs its datetimes restored
+def construct_user(data: Dict[str, Any]) -> User:
+    for field in ("created_at", "updated_at"):
+        if isinstance(data.get(field), str):
+            data[field] = datetime.fromisoformat(data[field])
+    personalization = data.get("personalization")
+    if personalization:
+        if isinstance(personalization.get("compiled_at"), str):
+            personalization["compiled_at"] = datetime.fromisoformat(personalization["compiled_at"])
+        data["personalization"] = Personalization.model_construct(**personalization)
+    return User.model_construct(**data)
+
 # Authentication middleware
 async def get_current_user(request: Request) -> User:
-    session_token = request.headers.get('Authorization')
+    session_token = get_bearer_token(request)
     if not session_token:
         raise HTTPException(status_code=401, detail="No session token provided")
     
-    session_token = session_token.replace('Bearer ', '')
-    
-    # Find user by session token
-    user_data = await db.users.find_one({"session_token": session_token})
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Invalid session token")
-    
-    return User(**user_data)
+    with timed_stage("auth"):
+        cached_user = await user_cache.get(auth_cache_key(session_token))
+        if cached_user is not None:
+            return construct_user(orjson.loads(cached_user))
+        
+        # Find user by session token
+        user_data = await db.users.find_one({"session_token": session_token}, USER_PROJECTION)
+        if not user_data:
+            raise HTTPException(status_code=401, detail="Invalid session token")
+        
+        await user_cache.set(auth_cache_key(session_token), orjson.dumps(user_data))
+        return construct_user(user_data)
 
-# Helper function to create personalized system message
-def create_personalized_system_message(user: User) -> str:
-    base_therapeutic_prompt = """You are an emotionally intelligent AI therapist equipped with multiple evidence-based psychological methodologies. Your primary role is to provide supportive, therapeutic conversations using specific psychological frameworks while maintaining appropriate boundaries. You implement the following psychological approaches based on user needs:
+# Static prompt building blocks for create_personalized_system_message
+BASE_THERAPEUTIC_PROMPT = """You are an emotionally intelligent AI therapist equipped with multiple evidence-based psychological methodologies. Your primary role is to provide supportive, therapeutic conversations using specific psychological frameworks while maintaining appropriate boundaries. You implement the following psychological approaches based on user needs:
 
 Core Psychological Methods Implementation
 - Cognitive Behavioral Therapy (CBT) - Identify and challenge negative thought patterns, automatic thoughts, and cognitive distortions
@@ -121,77 +592,1554 @@ Core Psychological Methods Implementation
 - Solution-Focused Brief Therapy (SFBT) - Focus on strengths, resources, and solutions
 - Motivational Interviewing - Use reflective listening and collaborative goal-setting"""
 
+THERAPEUTIC_BOUNDARIES = """
+    
+THERAPEUTIC BOUNDARIES: Never provide clinical diagnoses, suggest professional consultation when appropriate, maintain confidentiality, avoid medical advice, recognize AI limitations, provide crisis resources when needed.
+
+Adapt your response style to this user's unique profile while maintaining therapeutic effectiveness and authenticity."""
+
+ZODIAC_TRAITS = {
+    'Aries': 'Direct, energetic communication; appreciate quick, actionable advice',
+    'Taurus': 'Practical, steady approach; prefer detailed, reliable guidance',
+    'Gemini': 'Witty, versatile conversations; enjoy variety and intellectual engagement',
+    'Cancer': 'Empathetic, nurturing tone; focus on emotional validation and security',
+    'Leo': 'Warm, encouraging responses; appreciate recognition and positive reinforcement',
+    'Virgo': 'Detailed, helpful responses; prefer systematic, analytical approaches',
+    'Libra': 'Balanced, harmonious communication; focus on relationship and fairness themes',
+    'Scorpio': 'Deep, intense conversations; comfortable with emotional depth and transformation',
+    'Sagittarius': 'Optimistic, philosophical discussions; enjoy growth and adventure themes',
+    'Capricorn': 'Goal-oriented, practical advice; appreciate structure and achievement focus',
+    'Aquarius': 'Innovative, humanitarian perspective; enjoy unique insights and social themes',
+    'Pisces': 'Compassionate, intuitive responses; comfortable with emotions and creativity'
+}
+
+MBTI_GUIDANCE = {
+    'E': 'Engage socially, discuss relationships and external processing',
+    'I': 'Respect need for reflection, allow processing time',
+    'S': 'Focus on practical, concrete details and present realities',
+    'N': 'Explore patterns, possibilities, and future potential',
+    'T': 'Use logical structure, objective analysis',
+    'F': 'Consider values, emotions, and impact on people',
+    'J': 'Provide structure, clear steps, and organized approaches',
+    'P': 'Stay flexible, explore options, adapt as needed'
+}
+
+# The system message depends only on these profile fields
+PROFILE_FIELDS = ("age", "zodiac_sign", "profession", "personality_type")
+
+# Documents are not revalidated on read, so values stored before onboarding was validated are coerced here
+def profile_fingerprint(user: User) -> tuple:
+    return tuple(profile_text(value) for value in (user.age, user.zodiac_sign, user.profession, user.personality_type))
+
+AGE_GROUPS = [
+    (25, "gen_z", "Gen Z/Young Adult - Use casual, supportive language with modern references and emoji when appropriate"),
+    (40, "millennial", "Millennial - Balance casual and professional tone, relate to work-life balance challenges"),
+    (55, "gen_x", "Gen X - Use professional, straightforward communication with practical focus"),
+    (None, "boomer_plus", "Boomer+ - Use respectful, detailed explanations with formal but warm tone"),
+]
+
+# Free-text onboarding answers ("29", "29 years", " 41 ") -> plausible age, anything else -> None
+def parse_age(value: Any) -> Optional[int]:
+    match = re.match(r"\s*(\d{1,3})(?!\d)", str(value)) if value is not None else None
+    age = int(match.group(1)) if match else None
+    return age if age is not None and 0 < age < 125 else None
+
+def compile_personalization(
+    age: Optional[str],
+    zodiac_sign: Optional[str],
+    profession: Optional[str],
+    personality_type: Optional[str]
+) -> Personalization:
+    age, zodiac_sign, profession, personality_type = map(profile_text, (age, zodiac_sign, profession, personality_type))
+    
     # Personalization layer
     personalization = f"""
     
 USER PROFILE PERSONALIZATION:
 """
     
-    if user.age:
-        age = int(user.age)
-        if age < 25:
-            personalization += "- Age Group: Gen Z/Young Adult - Use casual, supportive language with modern references and emoji when appropriate\n"
-        elif age < 40:
-            personalization += "- Age Group: Millennial - Balance casual and professional tone, relate to work-life balance challenges\n"
-        elif age < 55:
-            personalization += "- Age Group: Gen X - Use professional, straightforward communication with practical focus\n"
-        else:
-            personalization += "- Age Group: Boomer+ - Use respectful, detailed explanations with formal but warm tone\n"
-    
-    if user.zodiac_sign:
-        zodiac_traits = {
-            'Aries': 'Direct, energetic communication; appreciate quick, actionable advice',
-            'Taurus': 'Practical, steady approach; prefer detailed, reliable guidance',
-            'Gemini': 'Witty, versatile conversations; enjoy variety and intellectual engagement',
-            'Cancer': 'Empathetic, nurturing tone; focus on emotional validation and security',
-            'Leo': 'Warm, encouraging responses; appreciate recognition and positive reinforcement',
-            'Virgo': 'Detailed, helpful responses; prefer systematic, analytical approaches',
-            'Libra': 'Balanced, harmonious communication; focus on relationship and fairness themes',
-            'Scorpio': 'Deep, intense conversations; comfortable with emotional depth and transformation',
-            'Sagittarius': 'Optimistic, philosophical discussions; enjoy growth and adventure themes',
-            'Capricorn': 'Goal-oriented, practical advice; appreciate structure and achievement focus',
-            'Aquarius': 'Innovative, humanitarian perspective; enjoy unique insights and social themes',
-            'Pisces': 'Compassionate, intuitive responses; comfortable with emotions and creativity'
+    age_bucket = None
+    parsed_age = parse_age(age)
+    if parsed_age is not None:
+        for limit, age_bucket, guidance in AGE_GROUPS:
+            if limit is None or parsed_age < limit:
+                personalization += f"- Age Group: {guidance}\n"
+                break
+    
+    if zodiac_sign:
+        trait = ZODIAC_TRAITS.get(zodiac_sign, 'Balanced approach')
+        personalization += f"- Zodiac ({zodiac_sign}): {trait}\n"
+    
+    if profession:
+        personalization += f"- Professional Context ({profession}): Adapt language and examples to their work environment and industry challenges\n"
+    
+    if personality_type:
+        type_guidance = [MBTI_GUIDANCE[letter] for letter in personality_type if letter in MBTI_GUIDANCE]
+        
+        if type_guidance:
+            personalization += f"- Personality Type ({personality_type}): {'; '.join(type_guidance)}\n"
+    
+    return Personalization(version=PERSONALIZATION_VERSION, age_bucket=age_bucket, block=personalization)
+
+# Fallback for users without a current stored block; memoized on the profile fingerprint, so
+# updated onboarding data yields a new key and stale prompts are never served
+@lru_cache(maxsize=int(os.environ.get('PROMPT_CACHE_MAX_ENTRIES', 1024)))
+def build_system_message(
+    age: Optional[str],
+    zodiac_sign: Optional[str],
+    profession: Optional[str],
+    personality_type: Optional[str]
+) -> str:
+    return system_message_for_block(compile_personalization(age, zodiac_sign, profession, personality_type).block)
+
+@lru_cache(maxsize=int(os.environ.get('PROMPT_CACHE_MAX_ENTRIES', 1024)))
+def system_message_for_block(block: str) -> str:
+    return BASE_THERAPEUTIC_PROMPT + block + THERAPEUTIC_BOUNDARIES
+
+# Helper function to create personalized system message
+def create_personalized_system_message(user: User) -> str:
+    personalization = user.personalization
+    if personalization is not None and personalization.version == PERSONALIZATION_VERSION:
+        return system_message_for_block(personalization.block)
+    return build_system_message(*profile_fingerprint(user))
+
+# Local lexicon-based emotion detection for user messages (no LLM call)
+EMOTION_LEXICON = {
+    'anxiety': [r'anxi\w*', r'worr\w*', r'nervous\w*', r'panic\w*', r'uneasy', r'restless', r'on edge', r'overthink\w*', r'tense'],
+    'sadness': [r'sad\w*', r'depress\w*', r'unhappy', r'cry\w*', r'cried', r'tears?', r'hopeless\w*', r'empty', r'miserable', r'heartbroken', r'griev\w*', r'grief', r'(?:feel(?:s|ing)?|felt) (?:so |really |very )?(?:down|blue)', r'worthless'],
+    'anger': [r'angry', r'anger', r'mad', r'furious', r'irritat\w*', r'annoy\w*', r'frustrat\w*', r'hate\w*', r'rage', r'resent\w*', r'pissed'],
+    'fear': [r'scared', r'afraid', r'fear\w*', r'terrif\w*', r'frighten\w*', r'dread\w*', r'unsafe'],
+    'stress': [r'stress\w*', r'overwhelm\w*', r'burn(?:ed|t)? ?out', r'exhaust\w*', r'pressure\w*', r'too much', r'deadlines?', r'overwork\w*', r'tired', r"(?:can'?t|cannot|can not) sleep", r'insomnia', r'sleepless\w*'],
+    'loneliness': [r'lonel\w*', r'alone', r'isolat\w*', r'no one', r'nobody', r'left out', r'abandon\w*', r'disconnected'],
+    'joy': [r'happ(?:y|ier|iest|iness)', r'glad', r'excit\w*', r'joy\w*', r'great', r'wonderful', r'amazing', r'better', r'calm', r'relieved', r'proud', r'hopeful'],
+    'gratitude': [r'thanks?', r'thank you', r'thankful', r'grateful', r'gratitude', r'appreciat\w*'],
+}
+
+# One alternation over every emotion; the optional negation prefix lets "not happy" be ignored
+EMOTION_PATTERN = re.compile(
+    r"\b(?P<negation>(?:not|never|no|don't|isn't|wasn't|without)\s+(?:\w+\s+)?)?(?:"
+    + "|".join(f"(?P<{emotion}>(?:{'|'.join(terms)}))" for emotion, terms in EMOTION_LEXICON.items())
+    + r")\b",
+    re.IGNORECASE
+)
+
+NEUTRAL_EMOTION = 'neutral'
+
+def detect_emotion(text: str) -> str:
+    scores: Dict[str, int] = {}
+    for match in EMOTION_PATTERN.finditer(text):
+        emotion = match.lastgroup
+        if match.group('negation'):
+            # "not happy" reads as low mood; other negated terms carry no signal
+            if emotion != 'joy':
+                continue
+            emotion = 'sadness'
+        scores[emotion] = scores.get(emotion, 0) + 1
+    if not scores:
+        return NEUTRAL_EMOTION
+    # Ties resolve in lexicon order, which puts distress labels ahead of positive ones
+    return max(scores, key=scores.get)
+
+def detect_emotions(texts: Iterable[str]) -> List[str]:
+    return [detect_emotion(text) for text in texts]
+
+MISTRAL_CHAT_URL = "https://api.mistral.ai/v1/chat/completions"
+
+# Process-wide Mistral client: one keep-alive connection pool and a cap on concurrent completions.
+# Background jobs (titles, summaries) have a separate, smaller cap and their own share of the pool,
+# so they never hold a slot an admitted chat turn is waiting for.
+class LLMGateway:
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        max_concurrency: int,
+        max_background_concurrency: int,
+        pool_size: int,
+        timeout: float
+    ):
+        self.model = model
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._background_semaphore = asyncio.Semaphore(max_background_concurrency)
+        connections = pool_size + max_background_concurrency
+        self._http = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            timeout=httpx.Timeout(timeout, connect=10.0)
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMGateway"]:
+        api_key = os.environ.get('MISTRAL_API_KEY')
+        if not api_key:
+            return None
+        return cls(
+            api_key=api_key,
+            model=os.environ.get('MISTRAL_MODEL', 'mistral-small'),
+            max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', 32)),
+            max_background_concurrency=int(os.environ.get('LLM_BACKGROUND_CONCURRENCY', 2)),
+            pool_size=int(os.environ.get('LLM_POOL_SIZE', 32)),
+            timeout=float(os.environ.get('LLM_TIMEOUT_SECONDS', 60))
+        )
+
+    def conversation(
+        self,
+        session_id: str,
+        system_message: str,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> "LlmConversation":
+        return LlmConversation(self, session_id, system_message, history)
+
+    def _record_usage(self, usage: Optional[Dict[str, int]]):
+        self.requests += 1
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+
+    async def complete(self, messages: List[Dict[str, str]], background: bool = False) -> str:
+        async with self._background_semaphore if background else self._semaphore:
+            response = await self._http.post(MISTRAL_CHAT_URL, json={"model": self.model, "messages": messages})
+            response.raise_for_status()
+            body = response.json()
+            self._record_usage(body.get("usage"))
+            return body["choices"][0]["message"]["content"]
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        payload = {"model": self.model, "messages": messages, "stream": True}
+        async with self._semaphore:
+            async with self._http.stream("POST", MISTRAL_CHAT_URL, json=payload, headers={"Accept": "text/event-stream"}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if chunk.get("usage"):
+                        self._record_usage(chunk["usage"])
+                    delta = chunk["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+# Lightweight per-request handle onto the shared gateway for one chat session
+class LlmConversation:
+    def __init__(
+        self,
+        gateway: LLMGateway,
+        session_id: str,
+        system_message: str,
+        history: Optional[List[Dict[str, str]]] = None
+    ):
+        self.gateway = gateway
+        self.session_id = session_id
+        self.messages = [{"role": "system", "content": system_message}] + (history or [])
+
+    async def send_message(self, text: str) -> str:
+        self.messages.append({"role": "user", "content": text})
+        reply = await self.gateway.complete(self.messages)
+        self.messages.append({"role": "assistant", "content": reply})
+        return reply
+
+    async def stream_message(self, text: str) -> AsyncIterator[str]:
+        self.messages.append({"role": "user", "content": text})
+        chunks = []
+        async for delta in self.gateway.stream(self.messages):
+            chunks.append(delta)
+            yield delta
+        self.messages.append({"role": "assistant", "content": "".join(chunks)})
+
+# Created on startup, closed on shutdown
+llm_gateway: Optional[LLMGateway] = None
+
+ADMISSION_WAIT = Histogram(
+    "vimukti_llm_admission_wait_seconds", "Time chat requests spent queued for an LLM slot", LATENCY_BUCKETS
+)
+
+# Admission control in front of LLM calls: a global and a per-user in-flight cap, with a bounded,
+# round-robin-fair wait queue. Requests that cannot be queued or time out get a fast 429.
+class LLMAdmissionController:
+    def __init__(self, max_inflight: int, max_inflight_per_user: int, max_queue: int, max_wait: float):
+        self.max_inflight = max_inflight
+        self.max_inflight_per_user = max_inflight_per_user
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.inflight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._user_inflight: Dict[str, int] = {}
+        self._waiters: "OrderedDict[str, deque]" = OrderedDict()
+        self._hold_time = 1.0  # moving average of slot hold time, for Retry-After
+
+    def _has_capacity(self, user_id: str) -> bool:
+        return (
+            self.inflight < self.max_inflight
+            and self._user_inflight.get(user_id, 0) < self.max_inflight_per_user
+        )
+
+    def _grant(self, user_id: str) -> Callable[[], None]:
+        self.inflight += 1
+        self.admitted += 1
+        self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+        granted_at = time.monotonic()
+        released = False
+        
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._hold_time = 0.9 * self._hold_time + 0.1 * (time.monotonic() - granted_at)
+            self.inflight -= 1
+            self._user_inflight[user_id] -= 1
+            if not self._user_inflight[user_id]:
+                del self._user_inflight[user_id]
+            self._wake()
+        
+        return release
+
+    def _wake(self):
+        # Serve users in rotation so one user's burst cannot starve the others
+        while self.inflight < self.max_inflight:
+            for user_id, waiters in self._waiters.items():
+                if self._user_inflight.get(user_id, 0) < self.max_inflight_per_user:
+                    break
+            else:
+                return
+            future = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._waiters.move_to_end(user_id)
+            else:
+                del self._waiters[user_id]
+            future.set_result(self._grant(user_id))
+
+    def _reject(self, detail: str) -> HTTPException:
+        retry_after = max(1, math.ceil(self._hold_time * (self.queued + 1) / self.max_inflight))
+        return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+    async def acquire(self, user_id: str) -> Callable[[], None]:
+        """Wait for an LLM slot; returns an idempotent release callable."""
+        # Any remaining waiters are blocked on caps, so a user with nothing queued may go straight through
+        if user_id not in self._waiters and self._has_capacity(user_id):
+            ADMISSION_WAIT.observe(0.0)
+            return self._grant(user_id)
+        
+        if self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise self._reject("Chat is busy, please retry shortly")
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(future)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(user_id, future)
+            raise
+        
+        ADMISSION_WAIT.observe(time.monotonic() - start)
+        if not future.done():
+            self._abandon(user_id, future)
+            self.rejected_timeout += 1
+            raise self._reject("Timed out waiting for a chat slot, please retry")
+        return future.result()
+
+    def _abandon(self, user_id: str, future: asyncio.Future):
+        if future.done():
+            # Granted just as the caller gave up: hand the slot straight back
+            future.result()()
+            return
+        future.cancel()
+        waiters = self._waiters[user_id]
+        waiters.remove(future)
+        self.queued -= 1
+        if not waiters:
+            del self._waiters[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "queue_depth": self.queued,
+            "queued_users": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+llm_admission = LLMAdmissionController(
+    max_inflight=int(os.environ.get('LLM_MAX_INFLIGHT', os.environ.get('LLM_MAX_CONCURRENCY', 32))),
+    max_inflight_per_user=int(os.environ.get('LLM_MAX_INFLIGHT_PER_USER', 2)),
+    max_queue=int(os.environ.get('LLM_QUEUE_MAX', 200)),
+    max_wait=float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', 10))
+)
+
+# Per-user fixed-window chat rate limit; counters live in the cache backend so all workers share them
+CHAT_RATE_LIMIT_PER_MINUTE = int(os.environ.get('CHAT_RATE_LIMIT_PER_MINUTE', 0))
+chat_rate_counters = CacheNamespace(
+    create_cache_backend(maxsize=int(os.environ.get('CHAT_RATE_LIMIT_MAX_USERS', 50000))), "ratelimit", ttl=60
+)
+
+async def enforce_chat_rate_limit(user_id: str):
+    if CHAT_RATE_LIMIT_PER_MINUTE <= 0:
+        return
+    now = time.time()
+    count = await chat_rate_counters.incr(f"chat:{user_id}:{int(now // 60)}")
+    if count > CHAT_RATE_LIMIT_PER_MINUTE:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many messages, please slow down",
+            headers={"Retry-After": str(max(1, math.ceil(60 - now % 60)))}
+        )
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+class ChatWrite(NamedTuple):
+    messages: List[Dict[str, Any]]
+    session_id: str
+    session_update: Dict[str, Any]
+
+async def _insert_messages(messages: List[Dict[str, Any]]):
+    try:
+        await db.chat_messages.insert_many(messages, ordered=False)
+    except BulkWriteError as e:
+        # insert_many assigns _id in place, so a retried batch only hits duplicates of what already landed
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+async def write_chat_batch(writes: List[ChatWrite]):
+    messages = [message for write in writes for message in write.messages]
+    session_ops = [UpdateOne({"id": write.session_id}, write.session_update, upsert=True) for write in writes]
+    await asyncio.gather(
+        timed_call("db_messages", _insert_messages(messages)),
+        timed_call("db_session", db.chat_sessions.bulk_write(session_ops, ordered=True))
+    )
+
+# Write-behind mode: chat writes are queued and drained to Mongo in batches by a background task
+class ChatWriteQueue:
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float, max_retries: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.batches_written = 0
+        self.writes_written = 0
+        self.retries = 0
+        self.writes_dropped = 0
+        self._queue: "asyncio.Queue[ChatWrite]" = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["ChatWriteQueue"]:
+        if not env_flag('CHAT_WRITE_BEHIND'):
+            return None
+        return cls(
+            maxsize=int(os.environ.get('CHAT_WRITE_QUEUE_SIZE', 10000)),
+            batch_size=int(os.environ.get('CHAT_WRITE_BATCH_SIZE', 500)),
+            flush_interval=float(os.environ.get('CHAT_WRITE_FLUSH_SECONDS', 0.05)),
+            max_retries=int(os.environ.get('CHAT_WRITE_MAX_RETRIES', 5))
+        )
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, write: ChatWrite):
+        # Blocks while the queue is full, pushing back on the chat routes
+        await self._queue.put(write)
+
+    async def _next_batch(self) -> List[ChatWrite]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write_with_retries(batch)
+            except Exception as e:
+                # Keep the drain task alive whatever a single batch does
+                self.writes_dropped += len(batch)
+                logger.error(f"Chat write batch failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_with_retries(self, batch: List[ChatWrite]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await write_chat_batch(batch)
+                self.batches_written += 1
+                self.writes_written += len(batch)
+                return
+            except PyMongoError as e:
+                if attempt == self.max_retries:
+                    self.writes_dropped += len(batch)
+                    logger.error(f"Dropping {len(batch)} chat writes after {attempt + 1} attempts: {str(e)}")
+                    return
+                self.retries += 1
+                logger.warning(f"Chat write batch failed (attempt {attempt + 1}), retrying: {str(e)}")
+                await asyncio.sleep(min(0.1 * 2 ** attempt, 5.0))
+
+    async def flush(self):
+        await self._queue.join()
+
+    async def stop(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self._queue.qsize(),
+            "maxsize": self._queue.maxsize,
+            "batches_written": self.batches_written,
+            "writes_written": self.writes_written,
+            "retries": self.retries,
+            "writes_dropped": self.writes_dropped,
+        }
+
+# Created on startup when CHAT_WRITE_BEHIND is enabled
+chat_write_queue: Optional[ChatWriteQueue] = None
+
+# Persist one user/assistant exchange and create or touch its chat session
+async def save_chat_turn(
+    session_id: str,
+    user_id: str,
+    user_text: str,
+    ai_text: str,
+    emotion: Optional[str] = None
+):
+    user_msg = ChatMessage(
+        session_id=session_id,
+        user_id=user_id,
+        content=user_text,
+        role="user",
+        emotion_detected=emotion
+    )
+    ai_msg = ChatMessage(
+        session_id=session_id,
+        user_id=user_id,
+        content=ai_text,
+        role="assistant"
+    )
+    # Mongo keeps milliseconds; keep the reply strictly after the prompt so history ordering holds
+    ai_msg.timestamp = max(ai_msg.timestamp, user_msg.timestamp + timedelta(milliseconds=1))
+    
+    # Upsert avoids the read-then-insert race when two turns open the same session
+    now = datetime.utcnow()
+    session_update = {
+        "$set": {"updated_at": now},
+        "$unset": {"archived_at": ""},
+        "$setOnInsert": {
+            "user_id": user_id,
+            "title": fallback_title(user_text),
+            "created_at": now
+        }
+    }
+    
+    write = ChatWrite([user_msg.dict(), ai_msg.dict()], session_id, session_update)
+    if chat_write_queue is not None:
+        await chat_write_queue.put(write)
+    else:
+        # Both messages in one round-trip, concurrently with the session upsert
+        await write_chat_batch([write])
+    
+    if conversation_states is not None:
+        conversation_states.append(session_id, [user_msg, ai_msg])
+
+# Opaque keyset cursors over (sort field, id)
+def encode_cursor(value: datetime, item_id: str) -> str:
+    raw = json.dumps([value.isoformat(), item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, item_id = json.loads(raw)
+        return datetime.fromisoformat(value), item_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Query clauses for (field, id) strictly after `after` and before `before` (decoded cursors), or up to
+# and including `before` when inclusive; the plain range on `field` keeps the index bounds tight
+def keyset_range(
+    field: str,
+    after: Optional[tuple] = None,
+    before: Optional[tuple] = None,
+    inclusive: bool = False,
+    id_field: str = "id"
+) -> Dict[str, Any]:
+    bounds: Dict[str, Any] = {}
+    clauses = []
+    if after is not None:
+        value, item_id = after
+        bounds["$gte"] = value
+        clauses.append({"$or": [{field: {"$gt": value}}, {field: value, id_field: {"$gt": item_id}}]})
+    if before is not None:
+        value, item_id = before
+        bounds["$lte"] = value
+        clauses.append({"$or": [{field: {"$lt": value}}, {field: value, id_field: {"$lte" if inclusive else "$lt": item_id}}]})
+    
+    query: Dict[str, Any] = {field: bounds} if bounds else {}
+    if clauses:
+        query["$and"] = clauses
+    return query
+
+def check_page_cursors(before: Optional[str], after: Optional[str]):
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+# `docs` holds up to limit + 1 items in travel order; the extra one only signals another page
+def finish_page(docs: List[Dict[str, Any]], limit: int, field: str, reverse: bool) -> tuple:
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1][field], docs[-1]["id"])
+    
+    # Pages are fetched in travel order but returned in display order
+    if reverse:
+        docs.reverse()
+    return docs, next_cursor
+
+# Fetch one page by keyset; `before` walks towards older items, `after` towards newer ones
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    field: str,
+    limit: int,
+    before: Optional[str],
+    after: Optional[str],
+    newest_first: bool,
+    projection: Optional[Dict[str, Any]] = None
+) -> tuple:
+    check_page_cursors(before, after)
+    
+    query = dict(query)
+    if after:
+        query.update(keyset_range(field, after=decode_cursor(after)))
+        direction = ASCENDING
+    else:
+        if before:
+            query.update(keyset_range(field, before=decode_cursor(before)))
+        direction = DESCENDING
+    
+    docs = await collection.find(query, projection).sort([(field, direction), ("id", direction)]).to_list(limit + 1)
+    return finish_page(docs, limit, field, reverse=(direction == DESCENDING) != newest_first)
+
+# Background jobs: a bounded queue drained by a small asyncio worker pool started with the app.
+# Request handlers only submit; jobs with the same (kind, key) are coalesced while one is pending,
+# and failures are retried with exponential backoff before being dropped.
+BACKGROUND_JOB_LAG = Histogram(
+    "vimukti_background_job_lag_seconds", "Time background jobs waited in the queue before starting", LATENCY_BUCKETS
+)
+BACKGROUND_JOB_DURATION = Histogram(
+    "vimukti_background_job_duration_seconds", "Background job run time, by kind and outcome", LATENCY_BUCKETS
+)
+
+class BackgroundJob(NamedTuple):
+    kind: str
+    key: str
+    kwargs: Dict[str, Any]
+    attempt: int
+    ready_at: float
+
+class BackgroundWorkerPool:
+    def __init__(self, workers: int, max_queue: int, max_retries: int, retry_delay: float):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.dropped = 0
+        self.running = 0
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: Dict[tuple, float] = {}
+        self._tasks: set = set()
+
+    @classmethod
+    def from_env(cls) -> "BackgroundWorkerPool":
+        return cls(
+            workers=int(os.environ.get('BACKGROUND_WORKERS', 4)),
+            max_queue=int(os.environ.get('BACKGROUND_QUEUE_MAX', 1000)),
+            max_retries=int(os.environ.get('BACKGROUND_MAX_RETRIES', 3)),
+            retry_delay=float(os.environ.get('BACKGROUND_RETRY_SECONDS', 2))
+        )
+
+    def register(self, kind: str, handler: Callable[..., Any]):
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, key: str, **kwargs) -> bool:
+        """Queue a job without waiting; returns False if it was coalesced or the queue is full."""
+        if (kind, key) in self._pending:
+            return False
+        try:
+            self._queue.put_nowait(BackgroundJob(kind, key, kwargs, 0, time.monotonic()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Background queue full, dropping {kind} job for {key}")
+            return False
+        self._pending[(kind, key)] = time.monotonic()
+        return True
+
+    def start(self):
+        for _ in range(self.workers):
+            self._spawn(self._work())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            BACKGROUND_JOB_LAG.observe(time.monotonic() - job.ready_at, kind=job.kind)
+            self.running += 1
+            start = time.perf_counter()
+            try:
+                await self._handlers[job.kind](**job.kwargs)
+                BACKGROUND_JOB_DURATION.observe(time.perf_counter() - start, kind=job.kind, outcome="ok")
+                self.completed += 1
+                self._pending.pop((job.kind, job.key), None)
+            except Exception as e:
+                BACKGROUND_JOB_DURATION.observe(time.perf_counter() - start, kind=job.kind, outcome="error")
+                self._retry_or_drop(job, e)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    def _retry_or_drop(self, job: BackgroundJob, error: Exception):
+        if job.attempt >= self.max_retries:
+            self.failed += 1
+            self._pending.pop((job.kind, job.key), None)
+            logger.error(f"Background {job.kind} job for {job.key} failed after {job.attempt + 1} attempts: {str(error)}")
+            return
+
+        self.retries += 1
+        delay = self.retry_delay * 2 ** job.attempt
+
+        async def requeue():
+            await asyncio.sleep(delay)
+            await self._queue.put(job._replace(attempt=job.attempt + 1, ready_at=time.monotonic()))
+
+        self._spawn(requeue())
+
+    async def stop(self, timeout: float = 5.0):
+        # Give queued jobs a moment to finish, then cancel workers and pending retries
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self._queue.qsize()} background jobs still queued")
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "workers": self.workers,
+            "depth": self._queue.qsize(),
+            "pending": len(self._pending),
+            "running": self.running,
+            "oldest_pending_seconds": now - min(self._pending.values()) if self._pending else 0.0,
+            "completed": self.completed,
+            "retries": self.retries,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+background_jobs = BackgroundWorkerPool.from_env()
+
+# Conversation context: a rolling summary on the session plus every turn it does not cover yet,
+# verbatim within the token budget. Once CONTEXT_SUMMARY_BATCH messages have built up beyond the
+# last CONTEXT_MAX_TURNS turns, the oldest batch is folded into the summary.
+CONTEXT_MAX_TURNS = int(os.environ.get('CONTEXT_MAX_TURNS', 10))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 6000))
+CONTEXT_SUMMARY_BATCH = max(1, int(os.environ.get('CONTEXT_SUMMARY_BATCH', 40)))
+
+SUMMARY_PROMPT = """You maintain a running summary of a supportive therapy conversation. Merge the previous summary with the new exchanges into one concise summary (at most 200 words) that keeps the user's key concerns, feelings, goals, coping strategies discussed and any safety-relevant details. Write in the third person and output only the summary."""
+
+class ConversationContext(NamedTuple):
+    system_message: str
+    history: List[Dict[str, str]]
+    prompt_tokens: int
+    first_turn: bool
+
+# Per-worker conversation state for active sessions, so follow-up turns skip the summary and
+# history reads. Assumes session-sticky routing: a turn served by another worker is not seen here.
+class ConversationState:
+    def __init__(self, user_id: str, summary: Optional[str], summary_cursor: Optional[str], messages: List[Dict[str, Any]]):
+        self.user_id = user_id
+        self.summary = summary
+        self.summary_cursor = summary_cursor
+        self.messages = messages
+        self.base_system_message: Optional[str] = None
+        self.system_message: Optional[str] = None
+        self.last_used = time.monotonic()
+        self.size = 0
+
+    def compose_system_message(self, base: str) -> str:
+        if self.system_message is None or base != self.base_system_message:
+            self.base_system_message = base
+            self.system_message = base
+            if self.summary:
+                self.system_message += f"\n\nSUMMARY OF EARLIER CONVERSATION:\n{self.summary}"
+        return self.system_message
+
+    def estimate_size(self) -> int:
+        # Shallow estimate: strings plus a fixed allowance per message dict
+        size = sys.getsizeof(self.summary or "") + 2 * sys.getsizeof(self.base_system_message or "")
+        return size + sum(sys.getsizeof(message["content"]) + 400 for message in self.messages)
+
+class ConversationStateStore:
+    def __init__(self, max_sessions: int, max_bytes: int, idle_ttl: float, max_messages: int):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> Optional["ConversationStateStore"]:
+        if not env_flag('CONVERSATION_STATE_ENABLED'):
+            return None
+        return cls(
+            max_sessions=int(os.environ.get('CONVERSATION_STATE_MAX_SESSIONS', 5000)),
+            max_bytes=int(os.environ.get('CONVERSATION_STATE_MAX_MB', 256)) * 1024 * 1024,
+            idle_ttl=float(os.environ.get('CONVERSATION_STATE_IDLE_SECONDS', 1800)),
+            max_messages=CONTEXT_MAX_TURNS * 2 + CONTEXT_SUMMARY_BATCH
+        )
+
+    def get(self, session_id: str, user_id: str) -> Optional[ConversationState]:
+        state = self._states.get(session_id)
+        if state is None or state.user_id != user_id or time.monotonic() - state.last_used > self.idle_ttl:
+            if state is not None:
+                self._remove(session_id)
+            self.misses += 1
+            return None
+        self.hits += 1
+        state.last_used = time.monotonic()
+        self._states.move_to_end(session_id)
+        return state
+
+    def put(self, session_id: str, state: ConversationState):
+        self._remove(session_id)
+        self._states[session_id] = state
+        self._resize(session_id)
+
+    def append(self, session_id: str, messages: List[ChatMessage]):
+        state = self._states.get(session_id)
+        if state is None:
+            return
+        # Truncate to Mongo's millisecond precision so cursors match what a fresh load would see
+        state.messages.extend(
+            {
+                "id": message.id,
+                "role": message.role,
+                "content": message.content,
+                "timestamp": message.timestamp.replace(microsecond=message.timestamp.microsecond // 1000 * 1000)
+            }
+            for message in messages
+        )
+        # Same window a fresh load would read; anything older belongs to the summary
+        del state.messages[:-self.max_messages]
+        self._resize(session_id)
+
+    def apply_summary(self, session_id: str, old_cursor: Optional[str], summary: str, cursor: str):
+        state = self._states.get(session_id)
+        if state is None or state.summary_cursor != old_cursor:
+            return
+        value, item_id = decode_cursor(cursor)
+        state.messages = [message for message in state.messages if (message["timestamp"], message["id"]) > (value, item_id)]
+        state.summary = summary
+        state.summary_cursor = cursor
+        state.system_message = None
+        self._resize(session_id)
+
+    def _remove(self, session_id: str):
+        state = self._states.pop(session_id, None)
+        if state is not None:
+            self.bytes -= state.size
+
+    def _resize(self, session_id: str):
+        state = self._states[session_id]
+        self.bytes -= state.size
+        state.size = state.estimate_size()
+        self.bytes += state.size
+        
+        # Idle sessions first, then least recently used, until back under both caps
+        now = time.monotonic()
+        for key in [key for key, other in self._states.items() if now - other.last_used > self.idle_ttl]:
+            self._remove(key)
+            self.evictions += 1
+        while self._states and (len(self._states) > self.max_sessions or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._states)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._states),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
         }
-        trait = zodiac_traits.get(user.zodiac_sign, 'Balanced approach')
-        personalization += f"- Zodiac ({user.zodiac_sign}): {trait}\n"
-    
-    if user.profession:
-        personalization += f"- Professional Context ({user.profession}): Adapt language and examples to their work environment and industry challenges\n"
-    
-    if user.personality_type:
-        mbti_guidance = {
-            'E': 'Engage socially, discuss relationships and external processing',
-            'I': 'Respect need for reflection, allow processing time',
-            'S': 'Focus on practical, concrete details and present realities',
-            'N': 'Explore patterns, possibilities, and future potential',
-            'T': 'Use logical structure, objective analysis',
-            'F': 'Consider values, emotions, and impact on people',
-            'J': 'Provide structure, clear steps, and organized approaches',
-            'P': 'Stay flexible, explore options, adapt as needed'
+
+conversation_states = ConversationStateStore.from_env()
+
+class ContextStats:
+    def __init__(self):
+        self.turns = 0
+        self.prompt_tokens_total = 0
+        self.prompt_tokens_last = 0
+        self.prompt_tokens_max = 0
+        self.summaries_written = 0
+
+    def record(self, prompt_tokens: int):
+        self.turns += 1
+        self.prompt_tokens_total += prompt_tokens
+        self.prompt_tokens_last = prompt_tokens
+        self.prompt_tokens_max = max(self.prompt_tokens_max, prompt_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "prompt_tokens_estimated_total": self.prompt_tokens_total,
+            "prompt_tokens_estimated_last": self.prompt_tokens_last,
+            "prompt_tokens_estimated_max": self.prompt_tokens_max,
+            "prompt_tokens_estimated_mean": self.prompt_tokens_total / self.turns if self.turns else 0.0,
+            "summaries_written": self.summaries_written,
         }
+
+context_stats = ContextStats()
+
+CONTEXT_MESSAGE_FIELDS = ("id", "role", "content", "timestamp")
+
+# Rough token count (~4 characters per token) used for budgeting only
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+async def load_conversation_state(session_id: str, user_id: str) -> ConversationState:
+    session = await db.chat_sessions.find_one(
+        {"id": session_id, "user_id": user_id},
+        {"_id": 0, "summary": 1, "summary_cursor": 1, "archived_until": 1}
+    ) or {}
+    summary = session.get("summary")
+    summary_cursor = session.get("summary_cursor")
+    
+    # Only messages newer than what the summary already covers; a resumed archived session takes
+    # the rest of its window from the archive
+    recent = [
+        {key: message[key] for key in CONTEXT_MESSAGE_FIELDS}
+        async for message in iter_session_messages(
+            session_id, user_id, session.get("archived_until"),
+            after=decode_cursor(summary_cursor) if summary_cursor else None,
+            descending=True,
+            limit=CONTEXT_MAX_TURNS * 2 + CONTEXT_SUMMARY_BATCH,
+            projection={"_id": 0, **{key: 1 for key in CONTEXT_MESSAGE_FIELDS}}
+        )
+    ]
+    recent.reverse()
+    return ConversationState(user_id, summary, summary_cursor, recent)
+
+async def build_conversation_context(
+    session_id: str,
+    user_id: str,
+    system_message: str,
+    user_text: str
+) -> ConversationContext:
+    state = conversation_states.get(session_id, user_id) if conversation_states is not None else None
+    if state is None:
+        state = await load_conversation_state(session_id, user_id)
+        if conversation_states is not None:
+            conversation_states.put(session_id, state)
+    
+    summary = state.summary
+    summary_cursor = state.summary_cursor
+    recent = state.messages
+    system_message = state.compose_system_message(system_message)
+    
+    # Unsummarised turns stay verbatim until folded; only the token budget trims the oldest
+    window = list(recent)
+    prompt_tokens = estimate_tokens(system_message) + estimate_tokens(user_text)
+    window_tokens = [estimate_tokens(message["content"]) for message in window]
+    history_tokens = sum(window_tokens)
+    while window and prompt_tokens + history_tokens > CONTEXT_TOKEN_BUDGET:
+        window.pop(0)
+        history_tokens -= window_tokens.pop(0)
+    prompt_tokens += history_tokens
+    
+    if len(recent) - CONTEXT_MAX_TURNS * 2 >= CONTEXT_SUMMARY_BATCH and llm_gateway is not None:
+        background_jobs.submit(
+            "summary", session_id, session_id=session_id, user_id=user_id, summary=summary, summary_cursor=summary_cursor
+        )
+    
+    context_stats.record(prompt_tokens)
+    history = [{"role": message["role"], "content": message["content"]} for message in window]
+    return ConversationContext(system_message, history, prompt_tokens, first_turn=not recent and not summary)
+
+async def fold_into_summary(session_id: str, user_id: str, summary: Optional[str], summary_cursor: Optional[str]):
+    session = await db.chat_sessions.find_one({"id": session_id, "user_id": user_id}, {"_id": 0, "id": 1, "archived_until": 1})
+    if session is None:
+        return
+    
+    # The oldest batch right after the cursor, so the summary never skips a message
+    messages = [
+        message async for message in iter_session_messages(
+            session_id, user_id, session.get("archived_until"),
+            after=decode_cursor(summary_cursor) if summary_cursor else None,
+            limit=CONTEXT_SUMMARY_BATCH,
+            projection={"_id": 0, **{key: 1 for key in CONTEXT_MESSAGE_FIELDS}}
+        )
+    ]
+    # Turns still in the write-behind queue are left for a later job
+    if len(messages) < CONTEXT_SUMMARY_BATCH:
+        return
+    
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    new_summary = await llm_gateway.complete([
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": f"Previous summary:\n{summary or '(none)'}\n\nNew exchanges:\n{transcript}"}
+    ], background=True)
+    
+    last = messages[-1]
+    new_cursor = encode_cursor(last["timestamp"], last["id"])
+    # Guarded on the old cursor so a concurrent fold or a retry cannot overwrite newer state
+    result = await db.chat_sessions.update_one(
+        {"id": session_id, "user_id": user_id, "summary_cursor": summary_cursor},
+        {"$set": {"summary": new_summary, "summary_cursor": new_cursor}}
+    )
+    if result.modified_count and conversation_states is not None:
+        conversation_states.apply_summary(session_id, summary_cursor, new_summary, new_cursor)
+    context_stats.summaries_written += 1
+
+background_jobs.register("summary", fold_into_summary)
+
+# Session titles start as a placeholder and are replaced by a generated one after the first turn
+NEW_CHAT_TITLE = "New Chat"
+
+TITLE_PROMPT = """Write a short, gentle title (at most 6 words) for a supportive conversation that opens with the user's message below. Do not include names or quotation marks. Output only the title."""
+
+def fallback_title(first_message: str) -> str:
+    return first_message[:50] + "..." if len(first_message) > 50 else first_message
+
+async def generate_session_title(session_id: str, user_id: str, first_message: str):
+    title = await llm_gateway.complete([
+        {"role": "system", "content": TITLE_PROMPT},
+        {"role": "user", "content": first_message}
+    ], background=True)
+    title = title.strip().strip('"').strip()[:80]
+    if not title:
+        return
+    
+    # Only replace placeholder titles, never one the user or an earlier job already set
+    await db.chat_sessions.update_one(
+        {"id": session_id, "user_id": user_id, "title": {"$in": [NEW_CHAT_TITLE, fallback_title(first_message)]}},
+        {"$set": {"title": title}}
+    )
+
+background_jobs.register("title", generate_session_title)
+
+# Cold storage: sessions idle for ARCHIVE_AFTER_DAYS have their messages packed into compressed
+# NDJSON chunks in chat_archives and removed from chat_messages. Each chunk holds a bounded run of
+# messages and is keyed by its first and last (timestamp, id), so a read only unpacks the chunks it
+# touches. The session's archived_until cursor splits its history: messages up to it are read from
+# the archive, newer ones from chat_messages. Per-day emotion counts are kept on each chunk so
+# analytics never has to unpack one.
+ARCHIVE_AFTER_DAYS = float(os.environ.get('ARCHIVE_AFTER_DAYS', 0))
+ARCHIVE_SWEEP_SECONDS = float(os.environ.get('ARCHIVE_SWEEP_SECONDS', 3600))
+ARCHIVE_SWEEP_BATCH = int(os.environ.get('ARCHIVE_SWEEP_BATCH', 500))
+ARCHIVE_CODEC = os.environ.get('ARCHIVE_CODEC', 'zlib')
+ARCHIVE_CHUNK_MESSAGES = int(os.environ.get('ARCHIVE_CHUNK_MESSAGES', 500))
+ARCHIVE_CHUNK_BYTES = int(os.environ.get('ARCHIVE_CHUNK_BYTES', 1024 * 1024))  # before compression
+# Every worker runs a sweeper, so a session is leased to one archiver at a time
+ARCHIVE_LEASE_SECONDS = float(os.environ.get('ARCHIVE_LEASE_SECONDS', 600))
+ARCHIVE_READ_CHUNK = 64 * 1024
+
+def compress_archive(data: bytes) -> tuple:
+    if ARCHIVE_CODEC == 'zstd':
+        import zstandard
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+def _archive_decompressor(codec: str):
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj()
+
+def decode_archived_message(line: bytes) -> Dict[str, Any]:
+    message = orjson.loads(line)
+    message["timestamp"] = datetime.fromisoformat(message["timestamp"])
+    return message
+
+def iter_archived_messages(chunk: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Decompress one archive chunk incrementally, yielding messages oldest first."""
+    decompressor = _archive_decompressor(chunk["codec"])
+    blob = chunk["blob"]
+    pending = b""
+    for offset in range(0, len(blob), ARCHIVE_READ_CHUNK):
+        pending += decompressor.decompress(blob[offset:offset + ARCHIVE_READ_CHUNK])
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield decode_archived_message(line)
+    if pending:
+        yield decode_archived_message(pending)
+
+def message_key(message: Dict[str, Any]) -> tuple:
+    return message["timestamp"], message["id"]
+
+async def iter_archive(
+    session_id: str,
+    user_id: str,
+    archived_until: tuple,
+    after: Optional[tuple],
+    before: Optional[tuple],
+    descending: bool
+) -> AsyncIterator[Dict[str, Any]]:
+    # Anything past archived_until (a chunk left by an interrupted run) is still read from chat_messages
+    upper, inclusive = (before, False) if before is not None and before <= archived_until else (archived_until, True)
+    clauses = [keyset_range("first_timestamp", before=upper, inclusive=inclusive, id_field="first_id")]
+    if after is not None:
+        clauses.append(keyset_range("last_timestamp", after=after, id_field="last_id"))
+    
+    direction = DESCENDING if descending else ASCENDING
+    chunks = db.chat_archives.find(
+        {"session_id": session_id, "user_id": user_id, "$and": clauses}, {"_id": 0, "codec": 1, "blob": 1}
+    ).sort([("first_timestamp", direction), ("first_id", direction)])
+    # A few chunks per round trip keeps memory bounded by the chunk size, not the session
+    async for chunk in chunks.batch_size(4):
+        messages = [
+            message for message in iter_archived_messages(chunk)
+            if (after is None or message_key(message) > after)
+            and (message_key(message) <= upper if inclusive else message_key(message) < upper)
+        ]
+        for message in reversed(messages) if descending else messages:
+            yield message
+
+async def iter_session_messages(
+    session_id: str,
+    user_id: str,
+    archived_until: Optional[str],
+    after: Optional[tuple] = None,
+    before: Optional[tuple] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+    projection: Optional[Dict[str, Any]] = MESSAGE_VIEW_PROJECTION,
+    batch_size: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """A session's messages strictly between the decoded cursors `after` and `before`, archive and
+    hot collection merged, in travel order (oldest first unless `descending`)."""
+    floor = decode_cursor(archived_until) if archived_until else None
+    direction = DESCENDING if descending else ASCENDING
+    hot = db.chat_messages.find(
+        {
+            "session_id": session_id,
+            "user_id": user_id,
+            **keyset_range("timestamp", after=max(filter(None, (after, floor)), default=None), before=before)
+        },
+        projection
+    ).sort([("timestamp", direction), ("id", direction)])
+    if limit is not None:
+        hot = hot.limit(limit)
+    if batch_size is not None:
+        hot = hot.batch_size(batch_size)
+    
+    sources = [hot]
+    if floor is not None:
+        archived = iter_archive(session_id, user_id, floor, after, before, descending)
+        sources = [hot, archived] if descending else [archived, hot]
+    
+    count = 0
+    for source in sources:
+        async for message in source:
+            yield message
+            count += 1
+            if count == limit:
+                return
+
+# fetch_page over a session's whole history, for sessions that have been archived
+async def fetch_message_page(
+    session_id: str,
+    user_id: str,
+    archived_until: str,
+    limit: int,
+    before: Optional[str],
+    after: Optional[str]
+) -> tuple:
+    check_page_cursors(before, after)
+    docs = [
+        message async for message in iter_session_messages(
+            session_id, user_id, archived_until,
+            after=decode_cursor(after) if after else None,
+            before=decode_cursor(before) if before else None,
+            descending=not after,
+            limit=limit + 1
+        )
+    ]
+    # Messages are shown oldest first
+    return finish_page(docs, limit, "timestamp", reverse=not after)
+
+def count_emotions_by_day(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    counts: Dict[tuple, int] = {}
+    for message in messages:
+        if message["role"] == "user" and message.get("emotion_detected"):
+            key = (message["timestamp"].strftime("%Y-%m-%d"), message["emotion_detected"])
+            counts[key] = counts.get(key, 0) + 1
+    return [{"day": day, "emotion": emotion, "count": count} for (day, emotion), count in sorted(counts.items())]
+
+async def write_archive_chunk(
+    session_id: str,
+    user_id: str,
+    archived_until: Optional[str],
+    messages: List[Dict[str, Any]],
+    lines: List[bytes]
+) -> Optional[str]:
+    """Store one chunk, then advance archived_until past it and drop its hot copies.
+    Returns the new cursor, or None if the session's archive moved on underneath this run."""
+    first, last = messages[0], messages[-1]
+    codec, blob = compress_archive(b"\n".join(lines))
+    archived_at = datetime.utcnow()
+    # Keyed by its first message, so a retried run rewrites the same chunk rather than adding one
+    chunk_key = {"session_id": session_id, "user_id": user_id, "first_timestamp": first["timestamp"], "first_id": first["id"]}
+    await db.chat_archives.replace_one(
+        chunk_key,
+        {
+            "session_id": session_id,
+            "user_id": user_id,
+            "first_timestamp": first["timestamp"],
+            "first_id": first["id"],
+            "last_timestamp": last["timestamp"],
+            "last_id": last["id"],
+            "codec": codec,
+            "blob": blob,
+            "message_count": len(messages),
+            "emotion_counts": count_emotions_by_day(messages),
+            "archived_at": archived_at
+        },
+        upsert=True
+    )
+    
+    # Readers switch to the chunk once archived_until covers it, so it is durable before the hot
+    # copies go; a crash in between leaves copies that readers ignore and the next run deletes
+    cursor = encode_cursor(last["timestamp"], last["id"])
+    result = await db.chat_sessions.update_one(
+        {"id": session_id, "user_id": user_id, "archived_until": archived_until},
+        {"$set": {"archived_until": cursor}}
+    )
+    if not result.modified_count:
+        # Its messages are still read from chat_messages, so the chunk would only be counted twice;
+        # keep it if another run committed the same chunk meanwhile
+        session = await db.chat_sessions.find_one({"id": session_id, "user_id": user_id}, {"_id": 0, "archived_until": 1})
+        covered = session and session.get("archived_until") and decode_cursor(session["archived_until"]) >= message_key(last)
+        if not covered:
+            await db.chat_archives.delete_one({**chunk_key, "archived_at": archived_at})
+        return None
+    await db.chat_messages.delete_many({"session_id": session_id, "id": {"$in": [message["id"] for message in messages]}})
+    return cursor
+
+async def archive_session(session_id: str, user_id: str, updated_at: datetime):
+    now = datetime.utcnow()
+    session = await db.chat_sessions.find_one_and_update(
+        {"id": session_id, "user_id": user_id, "$or": [{"archive_lease": None}, {"archive_lease": {"$lt": now}}]},
+        {"$set": {"archive_lease": now + timedelta(seconds=ARCHIVE_LEASE_SECONDS)}},
+        projection={"_id": 0, "id": 1, "archived_until": 1}
+    )
+    if session is None:
+        # Deleted, or another worker is archiving it
+        return
+    
+    try:
+        archived_until = session.get("archived_until")
+        query = {"session_id": session_id, "user_id": user_id}
+        if archived_until:
+            floor = decode_cursor(archived_until)
+            await db.chat_messages.delete_many({**query, **keyset_range("timestamp", before=floor, inclusive=True)})
+            query.update(keyset_range("timestamp", after=floor))
         
-        type_guidance = []
-        for letter in user.personality_type:
-            if letter in mbti_guidance:
-                type_guidance.append(mbti_guidance[letter])
+        # Re-archiving a session that woke up again appends chunks after the ones it already has
+        messages, lines, size = [], [], 0
+        hot = db.chat_messages.find(query, {"_id": 0, "user_id": 0}).sort([("timestamp", ASCENDING), ("id", ASCENDING)])
+        async for message in hot.batch_size(ARCHIVE_CHUNK_MESSAGES):
+            messages.append(message)
+            lines.append(orjson.dumps(message))
+            size += len(lines[-1])
+            if len(messages) >= ARCHIVE_CHUNK_MESSAGES or size >= ARCHIVE_CHUNK_BYTES:
+                archived_until = await write_archive_chunk(session_id, user_id, archived_until, messages, lines)
+                if archived_until is None:
+                    return
+                messages, lines, size = [], [], 0
+        if messages and await write_archive_chunk(session_id, user_id, archived_until, messages, lines) is None:
+            return
         
-        if type_guidance:
-            personalization += f"- Personality Type ({user.personality_type}): {'; '.join(type_guidance)}\n"
+        # A turn that arrived meanwhile moved updated_at on, leaving the session for the next sweep
+        await db.chat_sessions.update_one(
+            {"id": session_id, "user_id": user_id, "updated_at": updated_at}, {"$set": {"archived_at": datetime.utcnow()}}
+        )
+    finally:
+        await db.chat_sessions.update_one({"id": session_id, "user_id": user_id}, {"$unset": {"archive_lease": ""}})
+
+background_jobs.register("archive", archive_session)
+
+async def archive_sweeper():
+    while True:
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+            async for session in db.chat_sessions.find(
+                {"updated_at": {"$lt": cutoff}, "archived_at": None}, {"_id": 0, "id": 1, "user_id": 1, "updated_at": 1}
+            ).limit(ARCHIVE_SWEEP_BATCH):
+                background_jobs.submit(
+                    "archive", session["id"],
+                    session_id=session["id"], user_id=session["user_id"], updated_at=session["updated_at"]
+                )
+        except Exception as e:
+            logger.error(f"Archive sweep failed: {str(e)}")
+        await asyncio.sleep(ARCHIVE_SWEEP_SECONDS)
+
+archive_sweeper_task: Optional[asyncio.Task] = None
+
+# Emotion analytics: per-user (day, emotion) counts aggregated in Mongo and cached incrementally.
+# Counts up to `settled_until` are cached; only the newer tail is aggregated on each request,
+# and the settle delay leaves room for late writes (e.g. write-behind mode) before counts are frozen.
+ANALYTICS_SETTLE_SECONDS = float(os.environ.get('ANALYTICS_SETTLE_SECONDS', 300))
+
+emotion_analytics_cache = TTLCache(
+    maxsize=int(os.environ.get('ANALYTICS_CACHE_MAX_USERS', 10000)),
+    ttl=float(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', 3600)),
+)
+
+async def aggregate_emotion_counts(
+    user_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Dict[tuple, int]:
+    match: Dict[str, Any] = {"user_id": user_id, "role": "user", "emotion_detected": {"$ne": None}}
+    window = {}
+    if since is not None:
+        window["$gt"] = since
+    if until is not None:
+        window["$lte"] = until
+    if window:
+        match["timestamp"] = window
     
-    personalization += """
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "emotion": "$emotion_detected"
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+    counts = {}
+    async for row in db.chat_messages.aggregate(pipeline):
+        counts[(row["_id"]["day"], row["_id"]["emotion"])] = row["count"]
     
-THERAPEUTIC BOUNDARIES: Never provide clinical diagnoses, suggest professional consultation when appropriate, maintain confidentiality, avoid medical advice, recognize AI limitations, provide crisis resources when needed.
+    # Archived sessions are idle for days, so they only fall inside windows with no lower bound
+    if since is not None:
+        return counts
+    
+    # Only chunks covered by their session's archived_until count: one past it (left by an
+    # interrupted run) still has its messages in chat_messages
+    sessions = db.chat_sessions.find(
+        {"user_id": user_id, "archived_until": {"$ne": None}}, {"_id": 0, "id": 1, "archived_until": 1}
+    )
+    covered = [
+        {
+            "session_id": session["id"],
+            **keyset_range(
+                "last_timestamp", before=decode_cursor(session["archived_until"]), inclusive=True, id_field="last_id"
+            )
+        }
+        async for session in sessions
+    ]
+    if not covered:
+        return counts
+    
+    async for row in db.chat_archives.aggregate([
+        {"$match": {"user_id": user_id, "$or": covered}},
+        {"$unwind": "$emotion_counts"},
+        {"$group": {
+            "_id": {"day": "$emotion_counts.day", "emotion": "$emotion_counts.emotion"},
+            "count": {"$sum": "$emotion_counts.count"}
+        }}
+    ]):
+        key = (row["_id"]["day"], row["_id"]["emotion"])
+        counts[key] = counts.get(key, 0) + row["count"]
+    return counts
 
-Adapt your response style to this user's unique profile while maintaining therapeutic effectiveness and authenticity."""
+def _merge_counts(base: Dict[tuple, int], delta: Dict[tuple, int]) -> Dict[tuple, int]:
+    merged = dict(base)
+    for key, count in delta.items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
 
-    return base_therapeutic_prompt + personalization
+async def get_emotion_counts(user_id: str) -> Dict[tuple, int]:
+    settle_at = datetime.utcnow() - timedelta(seconds=ANALYTICS_SETTLE_SECONDS)
+    entry = emotion_analytics_cache.get(user_id)
+    
+    if entry is None:
+        entry = {"counts": await aggregate_emotion_counts(user_id, until=settle_at), "settled_until": settle_at}
+        emotion_analytics_cache.set(user_id, entry)
+    elif settle_at > entry["settled_until"]:
+        delta = await aggregate_emotion_counts(user_id, since=entry["settled_until"], until=settle_at)
+        # Replace rather than mutate so concurrent requests never double-apply a delta
+        entry = {"counts": _merge_counts(entry["counts"], delta), "settled_until": settle_at}
+        emotion_analytics_cache.set(user_id, entry)
+    
+    tail = await aggregate_emotion_counts(user_id, since=entry["settled_until"])
+    return _merge_counts(entry["counts"], tail)
+
+def build_emotion_report(counts: Dict[tuple, int], days: int) -> Dict[str, Any]:
+    if not counts:
+        return {"emotions": [], "daily": [], "weekly": [], "trends": {}}
+    
+    frame = pd.DataFrame(
+        [(day, emotion, count) for (day, emotion), count in counts.items()],
+        columns=["day", "emotion", "count"]
+    )
+    frame["day"] = pd.to_datetime(frame["day"])
+    daily = frame.pivot_table(index="day", columns="emotion", values="count", aggfunc="sum", fill_value=0)
+    
+    end = max(pd.Timestamp(datetime.utcnow().date()), daily.index.max())
+    daily = daily.reindex(pd.date_range(end - pd.Timedelta(days=days - 1), end, freq="D"), fill_value=0)
+    emotions = list(daily.columns)
+    
+    counts_matrix = daily.to_numpy(dtype=np.float64)
+    totals = counts_matrix.sum(axis=1)
+    shares = counts_matrix / np.where(totals == 0, 1, totals)[:, None]
+    # Share of all messages in the trailing 7 days rather than a mean of daily shares, so quiet days
+    # do not drag the trend towards 0; windows without any messages have no share (None)
+    window_counts = daily.rolling(7, min_periods=1).sum().to_numpy(dtype=np.float64)
+    window_totals = window_counts.sum(axis=1)
+    rolling = window_counts / np.where(window_totals == 0, 1, window_totals)[:, None]
+    
+    # Least-squares slope of each emotion's daily share over the days that have messages
+    active = totals > 0
+    slopes = np.zeros(len(emotions))
+    if active.sum() >= 2:
+        slopes = np.polyfit(np.arange(len(daily))[active], shares[active], 1)[0]
+    
+    weekly = daily.resample("W-MON", label="left", closed="left").sum()
+    weekly_matrix = weekly.to_numpy(dtype=np.float64)
+    weekly_totals = weekly_matrix.sum(axis=1)
+    weekly_shares = weekly_matrix / np.where(weekly_totals == 0, 1, weekly_totals)[:, None]
+    
+    def row(counts_row, shares_row) -> Dict[str, Any]:
+        return {
+            "total": int(counts_row.sum()),
+            "counts": {emotion: int(count) for emotion, count in zip(emotions, counts_row)},
+            "distribution": {emotion: round(float(share), 4) for emotion, share in zip(emotions, shares_row)}
+        }
+    
+    return {
+        "emotions": emotions,
+        "daily": [
+            {"date": day.strftime("%Y-%m-%d"), **row(counts_matrix[i], shares[i])}
+            for i, day in enumerate(daily.index)
+        ],
+        "weekly": [
+            {"week_start": week.strftime("%Y-%m-%d"), **row(weekly_matrix[i], weekly_shares[i])}
+            for i, week in enumerate(weekly.index)
+        ],
+        "trends": {
+            emotion: {
+                "rolling_7d": [
+                    round(float(value), 4) if total else None for value, total in zip(rolling[:, j], window_totals)
+                ],
+                "slope_per_day": round(float(slopes[j]), 6)
+            }
+            for j, emotion in enumerate(emotions)
+        }
+    }
 
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "Vimukti - Mental Wellness Platform API"}
 
+# Prometheus text exposition: latency histograms plus gauges for every internal counter
+def process_rss_bytes() -> int:
+    # Current RSS on Linux; elsewhere fall back to the peak reported by getrusage
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# Metrics are disabled unless METRICS_TOKEN is set; scrapers send it as a bearer token
+async def require_metrics_token(request: Request):
+    metrics_token = os.environ.get('METRICS_TOKEN')
+    if not metrics_token:
+        raise HTTPException(status_code=403, detail="Metrics are disabled")
+    if not secrets.compare_digest(get_bearer_token(request) or '', metrics_token):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+@api_router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    stats = {
+        "auth_cache": user_cache.stats(),
+        "prompt_cache": build_system_message.cache_info()._asdict(),
+        "personalization_prompt_cache": system_message_for_block.cache_info()._asdict(),
+        "chat_write_queue": chat_write_queue.stats() if chat_write_queue is not None else {},
+        "llm": llm_gateway.stats() if llm_gateway is not None else {},
+        "llm_admission": llm_admission.stats(),
+        "chat_rate_limit": chat_rate_counters.stats(),
+        "chat_dedup": chat_deduplicator.stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else {},
+        "context": context_stats.stats(),
+        "conversation_state": conversation_states.stats() if conversation_states is not None else {},
+        "background_jobs": background_jobs.stats(),
+        "emotion_analytics_cache": emotion_analytics_cache.stats(),
+        "process": {"pid": os.getpid(), "resident_memory_bytes": process_rss_bytes()}
+    }
+    lines = (
+        REQUEST_DURATION.render() + STAGE_DURATION.render() + ADMISSION_WAIT.render()
+        + RESPONSE_CACHE_SIMILARITY.render() + BACKGROUND_JOB_LAG.render() + BACKGROUND_JOB_DURATION.render()
+        + render_gauges("vimukti", stats)
+    )
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 @api_router.get("/login/google")
 async def login_google(request: Request):
     redirect_uri = f"{os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001')}/api/auth/google"
@@ -213,6 +2161,10 @@ async def auth_google(request: Request):
         session_token = secrets.token_urlsafe(32)
         
         if existing_user:
+            # Drop the cached user for the token being rotated out
+            if existing_user.get('session_token'):
+                await user_cache.delete(auth_cache_key(existing_user['session_token']))
+            
             # Update session token
             await db.users.update_one(
                 {"email": user_info['email']},
@@ -245,140 +2197,659 @@ async def auth_google(request: Request):
         from starlette.responses import RedirectResponse
         return RedirectResponse(url=redirect_url)
 
+# The compiled personalization block is prompt text, not part of the profile
 @api_router.get("/auth/profile")
 async def get_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+    return current_user.model_dump(exclude={"personalization"})
+
+# `profile` holds the user's current PROFILE_FIELDS, so answers left out keep their stored values
+def build_onboarding_update(onboarding_data: OnboardingResponse, profile: Dict[str, Any]) -> Dict[str, Any]:
+    update_data = {
+        "personality_archetype": onboarding_data.personality_archetype,
+        "onboarding_completed": True,
+        "updated_at": datetime.utcnow()
+    }
+    
+    # Add profile data if available
+    for key, field in ONBOARDING_FIELDS.items():
+        if key in onboarding_data.responses:
+            update_data[field] = onboarding_data.responses[key]
+    
+    merged = {**profile, **update_data}
+    update_data["personalization"] = compile_personalization(*(merged.get(field) for field in PROFILE_FIELDS)).model_dump()
+    return update_data
+
+# Compiles a block for every user still on an older (or no) PERSONALIZATION_VERSION. Each update is
+# guarded on the profile it was compiled from, so a concurrent onboarding always wins.
+PERSONALIZATION_BACKFILL_BATCH = int(os.environ.get('PERSONALIZATION_BACKFILL_BATCH', 500))
+
+# $ne cannot be answered from an index, so this is a collection scan; see BACKGROUND_SCANS
+PERSONALIZATION_BACKFILL_QUERY = {"personalization.version": {"$ne": PERSONALIZATION_VERSION}}
+
+async def backfill_personalization():
+    query = PERSONALIZATION_BACKFILL_QUERY
+    projection = {"_id": 0, "id": 1, **{field: 1 for field in PROFILE_FIELDS}}
+    operations = []
+    updated = 0
+    
+    async def flush():
+        nonlocal operations, updated
+        if operations:
+            result = await db.users.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+    
+    async for user in db.users.find(query, projection).batch_size(PERSONALIZATION_BACKFILL_BATCH):
+        profile = {field: user.get(field) for field in PROFILE_FIELDS}
+        operations.append(UpdateOne(
+            {"id": user["id"], **profile, **query},
+            {"$set": {"personalization": compile_personalization(*profile.values()).model_dump()}}
+        ))
+        if len(operations) >= PERSONALIZATION_BACKFILL_BATCH:
+            await flush()
+    await flush()
+    
+    if updated:
+        logger.info(f"Backfilled personalization v{PERSONALIZATION_VERSION} for {updated} users")
+
+background_jobs.register("personalization_backfill", backfill_personalization)
 
 @api_router.post("/onboarding")
 async def complete_onboarding(
     onboarding_data: OnboardingResponse,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     try:
-        # Extract data from onboarding responses
-        responses = onboarding_data.responses
-        
-        # Update user with onboarding data
-        update_data = {
-            "personality_archetype": onboarding_data.personality_archetype,
-            "onboarding_completed": True,
-            "updated_at": datetime.utcnow()
-        }
-        
-        # Add profile data if available
-        if 'name' in responses:
-            update_data['name'] = responses['name']
-        if 'age' in responses:
-            update_data['age'] = responses['age']
-        if 'zodiacSign' in responses:
-            update_data['zodiac_sign'] = responses['zodiacSign']
-        if 'profession' in responses:
-            update_data['profession'] = responses['profession']
-        if 'mbtiType' in responses:
-            update_data['personality_type'] = responses['mbtiType']
+        update_data = build_onboarding_update(onboarding_data, current_user.model_dump(include=set(PROFILE_FIELDS)))
         
         await db.users.update_one(
             {"id": current_user.id},
             {"$set": update_data}
         )
         
+        # Profile changed, so the cached user for this token is stale
+        await user_cache.delete(auth_cache_key(get_bearer_token(request)))
+        
         return {"message": "Onboarding completed", "archetype": onboarding_data.personality_archetype}
     
     except Exception as e:
         logging.error(f"Onboarding error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to complete onboarding")
 
-@api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_ai(
-    chat_request: ChatRequest,
-    current_user: User = Depends(get_current_user)
-):
-    try:
-        # Initialize Mistral chat
-        mistral_api_key = os.environ.get('MISTRAL_API_KEY')
-        if not mistral_api_key:
-            raise HTTPException(status_code=500, detail="Mistral API key not configured")
-        
-        # Create personalized system message
-        system_message = create_personalized_system_message(current_user)
-        
-        chat = LlmChat(
-            api_key=mistral_api_key,
-            session_id=chat_request.session_id,
-            system_message=system_message
-        ).with_model("mistral", "mistral-small")
-        
-        # Send user message
-        user_message = UserMessage(text=chat_request.message)
-        ai_response = await chat.send_message(user_message)
-        
-        # Save user message
-        user_msg = ChatMessage(
-            session_id=chat_request.session_id,
-            user_id=current_user.id,
-            content=chat_request.message,
-            role="user"
-        )
-        await db.chat_messages.insert_one(user_msg.dict())
-        
-        # Save AI response
-        ai_msg = ChatMessage(
-            session_id=chat_request.session_id,
-            user_id=current_user.id,
-            content=ai_response,
-            role="assistant"
+# Opt-in semantic cache for the first turn of a session. Openers are embedded as hashed character
+# trigram vectors and matched by cosine similarity against earlier openers from the same
+# personalization fingerprint, so "I feel anxious" and "i feel so anxious" can share one reply.
+RESPONSE_CACHE_SIMILARITY = Histogram(
+    "vimukti_response_cache_similarity", "Best cosine similarity found per opener lookup",
+    (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0)
+)
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_message(text: str) -> str:
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+# crc32 rather than hash() so vectors are stable across processes
+def embed_message(text: str, dim: int) -> np.ndarray:
+    padded = f" {normalize_message(text)} "
+    grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+    vector = np.bincount(
+        np.fromiter((zlib.crc32(gram.encode()) % dim for gram in grams), dtype=np.int64, count=len(grams)),
+        minlength=dim
+    ).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# Vectors for one profile's cached openers, rebuilt only when the shared entry list changes
+class OpenerIndex:
+    def __init__(self, entries: List[list], dim: int, previous: Optional["OpenerIndex"] = None):
+        reuse = {text: row for row, text in enumerate(previous.texts)} if previous is not None else {}
+        self.texts = [entry[0] for entry in entries]
+        self.responses = [entry[1] for entry in entries]
+        self.expires_at = np.array([entry[2] for entry in entries], dtype=np.float64)
+        self.vectors = np.empty((len(entries), dim), dtype=np.float32)
+        for row, text in enumerate(self.texts):
+            self.vectors[row] = previous.vectors[reuse[text]] if text in reuse else embed_message(text, dim)
+
+class ResponseCache:
+    def __init__(
+        self,
+        store: CacheNamespace,
+        threshold: float,
+        max_entries_per_profile: int,
+        max_profiles: int,
+        dim: int = 2048
+    ):
+        self.store = store
+        self.threshold = threshold
+        self.max_entries_per_profile = max_entries_per_profile
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        self._indexes = TTLCache(maxsize=max_profiles, ttl=store.ttl)
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        if not env_flag('RESPONSE_CACHE_ENABLED'):
+            return None
+        max_profiles = int(os.environ.get('RESPONSE_CACHE_MAX_PROFILES', 1024))
+        return cls(
+            store=CacheNamespace(
+                create_cache_backend(maxsize=max_profiles),
+                "openers",
+                ttl=float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 86400))
+            ),
+            threshold=float(os.environ.get('RESPONSE_CACHE_THRESHOLD', 0.92)),
+            max_entries_per_profile=int(os.environ.get('RESPONSE_CACHE_MAX_PER_PROFILE', 256)),
+            max_profiles=max_profiles
         )
-        await db.chat_messages.insert_one(ai_msg.dict())
-        
-        # Create or update chat session
-        existing_session = await db.chat_sessions.find_one({"id": chat_request.session_id})
-        if not existing_session:
-            session = ChatSession(
-                id=chat_request.session_id,
-                user_id=current_user.id,
-                title=chat_request.message[:50] + "..." if len(chat_request.message) > 50 else chat_request.message
-            )
-            await db.chat_sessions.insert_one(session.dict())
+
+    @staticmethod
+    def _key(fingerprint: tuple) -> str:
+        return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+    # Entries live in the cache backend as [text, response, expires_at] rows; vectors stay local
+    async def _load(self, fingerprint: tuple) -> Optional[OpenerIndex]:
+        raw = await self.store.get(self._key(fingerprint))
+        if raw is None:
+            return None
+        cached = self._indexes.get(fingerprint)
+        if cached is not None and cached[0] == raw:
+            return cached[1]
+        index = OpenerIndex(orjson.loads(raw), self.dim, cached[1] if cached is not None else None)
+        self._indexes.set(fingerprint, (raw, index))
+        return index
+
+    async def lookup(self, fingerprint: tuple, text: str) -> Optional[str]:
+        index = await self._load(fingerprint)
+        if index is None or not index.responses:
+            self.misses += 1
+            return None
+
+        similarities = index.vectors @ embed_message(text, self.dim)
+        similarities[index.expires_at < time.time()] = -1.0
+        best = int(np.argmax(similarities))
+        RESPONSE_CACHE_SIMILARITY.observe(float(similarities[best]))
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return index.responses[best]
+
+    async def add(self, fingerprint: tuple, text: str, response: str):
+        index = await self._load(fingerprint)
+        entries = list(zip(index.texts, index.responses, index.expires_at.tolist())) if index is not None else []
+
+        # Drop expired rows, then the oldest ones once the profile is full; last writer wins across workers
+        now = time.time()
+        entries = [list(entry) for entry in entries if entry[2] >= now]
+        keep = self.max_entries_per_profile - 1
+        entries = entries[max(0, len(entries) - keep):]
+        entries.append([normalize_message(text), response, now + self.store.ttl])
+        raw = orjson.dumps(entries)
+        await self.store.set(self._key(fingerprint), raw)
+        self._indexes.set(fingerprint, (raw, OpenerIndex(entries, self.dim, index)))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "threshold": self.threshold,
+            "profiles": len(self._indexes),
+        }
+
+# Created on startup when RESPONSE_CACHE_ENABLED is set
+response_cache: Optional[ResponseCache] = None
+
+# Duplicate chat submissions (double clicks, client retries) share one LLM call and one persisted turn.
+# Without an Idempotency-Key, identical messages to a session are only coalesced while the first is
+# in flight, so repeating "yes" later is a new turn. With one, the key alone identifies the turn:
+# its reply is replayed for IDEMPOTENCY_TTL_SECONDS, and reusing it for another message is rejected.
+class ChatTurnDeduplicator:
+    def __init__(self, idempotency_ttl: float, maxsize: int):
+        self.coalesced = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self._inflight: Dict[str, tuple] = {}
+        self._completed = TTLCache(maxsize=maxsize, ttl=idempotency_ttl)
+
+    @staticmethod
+    def fingerprint(chat_request: ChatRequest) -> str:
+        return hashlib.sha256(f"{chat_request.session_id}\n{chat_request.message.strip()}".encode()).hexdigest()
+
+    def key(self, user_id: str, chat_request: ChatRequest, idempotency_key: Optional[str]) -> str:
+        if idempotency_key:
+            return f"idempotency:{user_id}:{idempotency_key}"
+        return f"message:{user_id}:{self.fingerprint(chat_request)}"
+
+    def lookup(self, key: str, chat_request: ChatRequest) -> Optional[Union[ChatResponse, asyncio.Future]]:
+        entry = self._completed.get(key) or self._inflight.get(key)
+        if entry is None:
+            return None
+        fingerprint, turn = entry
+        if fingerprint != self.fingerprint(chat_request):
+            self.conflicts += 1
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different message")
+        if isinstance(turn, ChatResponse):
+            self.replayed += 1
         else:
-            await db.chat_sessions.update_one(
-                {"id": chat_request.session_id},
-                {"$set": {"updated_at": datetime.utcnow()}}
-            )
+            self.coalesced += 1
+        return turn
+
+    def register(self, key: str, chat_request: ChatRequest, future: asyncio.Future):
+        fingerprint = self.fingerprint(chat_request)
+        self._inflight[key] = (fingerprint, future)
+        
+        def on_done(done_future: asyncio.Future):
+            if self._inflight.get(key, (None, None))[1] is done_future:
+                del self._inflight[key]
+            # Only explicit keys replay, and failed turns are not remembered, so a retry runs again
+            if key.startswith("idempotency:") and not done_future.cancelled() and done_future.exception() is None:
+                self._completed.set(key, (fingerprint, done_future.result()))
         
-        return ChatResponse(
-            message=ai_response,
-            session_id=chat_request.session_id
+        future.add_done_callback(on_done)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+        }
+
+chat_deduplicator = ChatTurnDeduplicator(
+    idempotency_ttl=float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 3600)),
+    maxsize=int(os.environ.get('CHAT_DEDUP_MAX_ENTRIES', 10000))
+)
+
+# Shared by the plain and streaming chat routes: everything before the LLM call, then everything after it
+class PreparedChatTurn(NamedTuple):
+    emotion: str
+    context: ConversationContext
+    use_response_cache: bool
+    cached_reply: Optional[str]
+    chat: Optional[LlmConversation]
+    release: Callable[[], None]
+
+async def prepare_chat_turn(chat_request: ChatRequest, current_user: User) -> PreparedChatTurn:
+    if llm_gateway is None:
+        raise HTTPException(status_code=500, detail="Mistral API key not configured")
+    await enforce_chat_rate_limit(current_user.id)
+    
+    with timed_stage("emotion"):
+        emotion = detect_emotion(chat_request.message)
+    
+    # Create personalized system message
+    with timed_stage("prompt"):
+        system_message = create_personalized_system_message(current_user)
+    
+    with timed_stage("context"):
+        context = await build_conversation_context(
+            chat_request.session_id, current_user.id, system_message, chat_request.message
+        )
+    use_response_cache = response_cache is not None and context.first_turn
+    if use_response_cache:
+        with timed_stage("response_cache"):
+            cached_reply = await response_cache.lookup(profile_fingerprint(current_user), chat_request.message)
+        if cached_reply is not None:
+            return PreparedChatTurn(emotion, context, use_response_cache, cached_reply, None, lambda: None)
+    
+    chat = llm_gateway.conversation(chat_request.session_id, context.system_message, context.history)
+    # Admit before any reply is sent, so a full queue is a real 429 on the streaming route too
+    with timed_stage("admission"):
+        release = await llm_admission.acquire(current_user.id)
+    return PreparedChatTurn(emotion, context, use_response_cache, None, chat, release)
+
+async def finish_chat_turn(
+    chat_request: ChatRequest,
+    current_user: User,
+    prepared: PreparedChatTurn,
+    ai_response: str
+) -> ChatResponse:
+    if prepared.use_response_cache and prepared.cached_reply is None:
+        await response_cache.add(profile_fingerprint(current_user), chat_request.message, ai_response)
+    
+    with timed_stage("persist"):
+        await save_chat_turn(chat_request.session_id, current_user.id, chat_request.message, ai_response, prepared.emotion)
+    if prepared.context.first_turn:
+        background_jobs.submit(
+            "title", chat_request.session_id,
+            session_id=chat_request.session_id, user_id=current_user.id, first_message=chat_request.message
         )
+    
+    return ChatResponse(
+        message=ai_response,
+        emotion_detected=prepared.emotion,
+        session_id=chat_request.session_id
+    )
+
+async def run_chat_turn(chat_request: ChatRequest, current_user: User) -> ChatResponse:
+    try:
+        prepared = await prepare_chat_turn(chat_request, current_user)
+        ai_response = prepared.cached_reply
+        if ai_response is None:
+            # Send user message
+            try:
+                with timed_stage("llm"):
+                    ai_response = await prepared.chat.send_message(chat_request.message)
+            finally:
+                prepared.release()
+        return await finish_chat_turn(chat_request, current_user, prepared, ai_response)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to process chat message")
 
-@api_router.get("/chat/sessions")
-async def get_chat_sessions(current_user: User = Depends(get_current_user)):
-    sessions = await db.chat_sessions.find(
-        {"user_id": current_user.id}
-    ).sort("updated_at", -1).to_list(50)
+@api_router.post("/chat", response_model=ChatResponse)
+async def chat_with_ai(
+    chat_request: ChatRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    key = chat_deduplicator.key(current_user.id, chat_request, request.headers.get('Idempotency-Key'))
+    existing = chat_deduplicator.lookup(key, chat_request)
+    if isinstance(existing, ChatResponse):
+        return existing
+    
+    if existing is None:
+        existing = asyncio.ensure_future(run_chat_turn(chat_request, current_user))
+        chat_deduplicator.register(key, chat_request, existing)
+    
+    # Shielded so the turn still completes and persists if this particular caller disconnects
+    return await asyncio.shield(existing)
+
+async def replay_chat_stream(existing: Union[ChatResponse, asyncio.Future]) -> AsyncIterator[str]:
+    try:
+        response = existing if isinstance(existing, ChatResponse) else await asyncio.shield(existing)
+        yield format_sse({"content": response.message})
+        yield format_sse(response.dict(), event="done")
+    except Exception:
+        yield format_sse({"detail": "Failed to process chat message"}, event="error")
+
+@api_router.post("/chat/stream")
+async def chat_with_ai_stream(
+    chat_request: ChatRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    key = chat_deduplicator.key(current_user.id, chat_request, request.headers.get('Idempotency-Key'))
+    existing = chat_deduplicator.lookup(key, chat_request)
+    if existing is not None:
+        # A duplicate gets the original's reply in one chunk once it is ready
+        return StreamingResponse(
+            replay_chat_stream(existing),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    turn = asyncio.get_running_loop().create_future()
+    chat_deduplicator.register(key, chat_request, turn)
+    
+    try:
+        prepared = await prepare_chat_turn(chat_request, current_user)
+    except BaseException as e:
+        turn.set_exception(e if isinstance(e, HTTPException) else HTTPException(status_code=500, detail="Failed to process chat message"))
+        raise
+    
+    async def event_stream():
+        try:
+            if prepared.cached_reply is not None:
+                ai_response = prepared.cached_reply
+                yield format_sse({"content": ai_response})
+            else:
+                # Headers are already sent, so stream stages only reach the histograms
+                llm_start = time.perf_counter()
+                first_token = True
+                async for delta in prepared.chat.stream_message(chat_request.message):
+                    if first_token:
+                        STAGE_DURATION.observe(time.perf_counter() - llm_start, stage="llm_first_token")
+                        first_token = False
+                    yield format_sse({"content": delta})
+                STAGE_DURATION.observe(time.perf_counter() - llm_start, stage="llm")
+                prepared.release()
+                ai_response = prepared.chat.messages[-1]["content"]
+            
+            # Persist only once the full reply has been received
+            response = await finish_chat_turn(chat_request, current_user, prepared, ai_response)
+            turn.set_result(response)
+            yield format_sse(response.dict(), event="done")
+        except Exception as e:
+            logging.error(f"Chat stream error: {str(e)}")
+            yield format_sse({"detail": "Failed to process chat message"}, event="error")
+        finally:
+            prepared.release()
+            if not turn.done():
+                turn.set_exception(HTTPException(status_code=500, detail="Failed to process chat message"))
+    
+    def finish():
+        prepared.release()
+        # Client left before the stream started; unblock any duplicates waiting on this turn
+        if not turn.done():
+            turn.set_exception(HTTPException(status_code=500, detail="Chat stream was abandoned"))
+    
+    # The background task also runs when the client disconnects before the stream starts
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(finish)
+    )
+
+# Sessions newest first; pass next_cursor back as `before` for older sessions
+@api_router.get("/chat/sessions", response_model=ChatSessionPage)
+async def get_chat_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    sessions, next_cursor = await fetch_page(
+        db.chat_sessions, {"user_id": current_user.id}, "updated_at", limit, before, after,
+        newest_first=True, projection=SESSION_LIST_PROJECTION
+    )
     
-    return [ChatSession(**session) for session in sessions]
+    # Projected documents already match the response model, so hand them straight to orjson
+    return ORJSONResponse({"items": sessions, "next_cursor": next_cursor})
 
-@api_router.get("/chat/sessions/{session_id}/messages")
+# Messages oldest first; without a cursor the latest page is returned and next_cursor (as `before`) pages back
+@api_router.get("/chat/sessions/{session_id}/messages", response_model=ChatMessagePage)
 async def get_chat_messages(
     session_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    messages = await db.chat_messages.find(
-        {"session_id": session_id, "user_id": current_user.id}
-    ).sort("timestamp", 1).to_list(1000)
+    session = await db.chat_sessions.find_one({"id": session_id, "user_id": current_user.id}, {"_id": 0, "archived_until": 1})
+    
+    # Archived sessions page over archive + hot messages as one ordered history
+    if session and session.get("archived_until"):
+        messages, next_cursor = await fetch_message_page(
+            session_id, current_user.id, session["archived_until"], limit, before, after
+        )
+    else:
+        messages, next_cursor = await fetch_page(
+            db.chat_messages,
+            {"session_id": session_id, "user_id": current_user.id},
+            "timestamp", limit, before, after, newest_first=False, projection=MESSAGE_VIEW_PROJECTION
+        )
     
-    return [ChatMessage(**message) for message in messages]
+    return ORJSONResponse({"items": messages, "next_cursor": next_cursor})
+
+@api_router.get("/analytics/emotions")
+async def get_emotion_analytics(
+    days: int = Query(90, ge=7, le=730),
+    current_user: User = Depends(get_current_user)
+):
+    counts = await get_emotion_counts(current_user.id)
+    return build_emotion_report(counts, days)
 
 @api_router.post("/chat/sessions")
 async def create_chat_session(current_user: User = Depends(get_current_user)):
-    session = ChatSession(user_id=current_user.id, title="New Chat")
+    session = ChatSession(user_id=current_user.id, title=NEW_CHAT_TITLE)
     await db.chat_sessions.insert_one(session.dict())
     return session
 
+# Full-history export: every session followed by its messages as NDJSON, read through cursors in
+# batches and flushed in small chunks so memory stays flat however long the history is
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+EXPORT_CHUNK_BYTES = 64 * 1024
+SESSION_EXPORT_PROJECTION = {"_id": 0, "id": 1, "title": 1, "created_at": 1, "updated_at": 1, "archived_until": 1}
+
+async def export_records(user_id: str) -> AsyncIterator[Dict[str, Any]]:
+    sessions = db.chat_sessions.find({"user_id": user_id}, SESSION_EXPORT_PROJECTION)
+    async for session in sessions.sort([("updated_at", DESCENDING), ("id", DESCENDING)]).batch_size(EXPORT_BATCH_SIZE):
+        archived_until = session.pop("archived_until", None)
+        yield {"type": "session", **session}
+        
+        # Archived chunks first, one at a time, then the hot collection through a cursor
+        async for message in iter_session_messages(session["id"], user_id, archived_until, batch_size=EXPORT_BATCH_SIZE):
+            yield {"type": "message", **message}
+
+async def export_user_history(user_id: str, compress: bool = False) -> AsyncIterator[bytes]:
+    # wbits=31 writes a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+    async for record in export_records(user_id):
+        buffer += orjson.dumps(record)
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+    tail = compressor.compress(bytes(buffer)) + compressor.flush() if compressor else bytes(buffer)
+    if tail:
+        yield tail
+
+@api_router.get("/export")
+async def export_chat_history(gzip: bool = False, current_user: User = Depends(get_current_user)):
+    filename = f"vimukti-export-{datetime.utcnow():%Y%m%d}.ndjson" + (".gz" if gzip else "")
+    
+    async def stream():
+        try:
+            async for chunk in export_user_history(current_user.id, compress=gzip):
+                yield chunk
+        except Exception as e:
+            # Headers are already sent, so a failure can only truncate the download
+            logging.error(f"Export error for user {current_user.id}: {str(e)}")
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Admin routes are disabled unless ADMIN_API_KEY is set; callers send it as X-Admin-Key
+async def require_admin(request: Request):
+    admin_key = os.environ.get('ADMIN_API_KEY')
+    if not admin_key:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not secrets.compare_digest(request.headers.get('X-Admin-Key', ''), admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+BULK_ONBOARDING_CHUNK = int(os.environ.get('BULK_ONBOARDING_CHUNK', 1000))
+BULK_ONBOARDING_MAX_ERRORS = int(os.environ.get('BULK_ONBOARDING_MAX_ERRORS', 1000))
+
+class BulkOnboardingResult:
+    def __init__(self):
+        self.received = 0
+        self.applied = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, line: int, user_id: Optional[str], detail: str):
+        self.failed += 1
+        if len(self.errors) < BULK_ONBOARDING_MAX_ERRORS:
+            self.errors.append({"line": line, "user_id": user_id, "error": detail})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[tuple]:
+    """Yield (line_number, raw_line) from a streamed request body without buffering all of it."""
+    pending = b""
+    line_number = 0
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if pending.strip():
+        yield line_number + 1, pending
+
+async def apply_onboarding_chunk(chunk: List[tuple], result: BulkOnboardingResult):
+    # One $in lookup finds unknown users, their current profiles and the session tokens whose cached
+    # profiles go stale
+    user_ids = [record.user_id for _, record in chunk]
+    projection = {"_id": 0, "id": 1, "session_token": 1, **{field: 1 for field in PROFILE_FIELDS}}
+    users = {user["id"]: user async for user in db.users.find({"id": {"$in": user_ids}}, projection)}
+    tokens = {user_id: user.get("session_token") for user_id, user in users.items()}
+    
+    operations, lines = [], []
+    for line, record in chunk:
+        if record.user_id not in users:
+            result.error(line, record.user_id, "User not found")
+            continue
+        update = build_onboarding_update(record, {field: users[record.user_id].get(field) for field in PROFILE_FIELDS})
+        operations.append(UpdateOne({"id": record.user_id}, {"$set": update}))
+        lines.append((line, record.user_id))
+    if not operations:
+        return
+    
+    failed = set()
+    try:
+        await db.users.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            line, user_id = lines[write_error["index"]]
+            failed.add(write_error["index"])
+            result.error(line, user_id, write_error.get("errmsg", "Write failed"))
+    result.applied += len(operations) - len(failed)
+    
+    stale = [tokens[user_id] for index, (_, user_id) in enumerate(lines) if index not in failed and tokens[user_id]]
+    await asyncio.gather(*(user_cache.delete(auth_cache_key(token)) for token in stale))
+
+@api_router.post("/admin/onboarding/bulk", dependencies=[Depends(require_admin)])
+async def bulk_onboarding(request: Request):
+    """Apply NDJSON OnboardingResponse records; validated and written in chunks, errors reported per line."""
+    result = BulkOnboardingResult()
+    chunk: List[tuple] = []
+    chunk_users = set()
+    
+    async for line, raw in iter_ndjson_lines(request):
+        result.received += 1
+        try:
+            record = OnboardingResponse.model_validate_json(raw)
+        except ValidationError as e:
+            result.error(line, None, "; ".join(f"{'.'.join(map(str, err['loc'])) or 'record'}: {err['msg']}" for err in e.errors()))
+            continue
+        
+        # Unordered writes within a chunk, so a repeated user starts a new chunk to keep the last record winning
+        if len(chunk) >= BULK_ONBOARDING_CHUNK or record.user_id in chunk_users:
+            await apply_onboarding_chunk(chunk, result)
+            chunk, chunk_users = [], set()
+        chunk.append((line, record))
+        chunk_users.add(record.user_id)
+    
+    if chunk:
+        await apply_onboarding_chunk(chunk, result)
+    return result.as_dict()
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -388,8 +2859,12 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
 
+# Outermost, so request timings cover every other middleware
+app.add_middleware(TimingMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -397,6 +2872,140 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def ensure_indexes():
+    for collection_name, indexes in DB_INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except PyMongoError as e:
+            logger.error(f"Failed to create indexes on {collection_name}: {str(e)}")
+
+def _plan_stages(plan) -> List[str]:
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    return []
+
+# (collection, filter, sort) for each query issued by the routes and the archive, checked with
+# explain() at startup. Cursor shapes carry the keyset clauses the routes actually send.
+SAMPLE_CURSOR = (datetime(1970, 1, 1), "")
+NEWEST_FIRST = [("timestamp", DESCENDING), ("id", DESCENDING)]
+OLDEST_FIRST = [("timestamp", ASCENDING), ("id", ASCENDING)]
+QUERY_SHAPES = [
+    ("users", {"session_token": ""}, None),
+    ("users", {"email": ""}, None),
+    ("users", {"id": ""}, None),
+    ("users", {"id": {"$in": [""]}}, None),
+    ("chat_sessions", {"id": ""}, None),
+    ("chat_sessions", {"user_id": ""}, [("updated_at", DESCENDING), ("id", DESCENDING)]),
+    ("chat_sessions", {"user_id": "", **keyset_range("updated_at", before=SAMPLE_CURSOR)}, [("updated_at", DESCENDING), ("id", DESCENDING)]),
+    ("chat_sessions", {"user_id": "", **keyset_range("updated_at", after=SAMPLE_CURSOR)}, [("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ("chat_sessions", {"updated_at": {"$lt": datetime(1970, 1, 1)}, "archived_at": None}, None),
+    ("chat_sessions", {"user_id": "", "archived_until": {"$ne": None}}, None),
+    ("chat_messages", {"session_id": "", "user_id": ""}, NEWEST_FIRST),
+    ("chat_messages", {"session_id": "", "user_id": ""}, OLDEST_FIRST),
+    ("chat_messages", {"session_id": "", "user_id": "", **keyset_range("timestamp", before=SAMPLE_CURSOR)}, NEWEST_FIRST),
+    ("chat_messages", {"session_id": "", "user_id": "", **keyset_range("timestamp", after=SAMPLE_CURSOR)}, OLDEST_FIRST),
+    ("chat_messages", {"session_id": "", "user_id": "", **keyset_range("timestamp", after=SAMPLE_CURSOR)}, NEWEST_FIRST),
+    (
+        "chat_messages",
+        {"session_id": "", "user_id": "", **keyset_range("timestamp", after=SAMPLE_CURSOR, before=SAMPLE_CURSOR)},
+        NEWEST_FIRST
+    ),
+    ("chat_messages", {"session_id": "", "user_id": "", **keyset_range("timestamp", before=SAMPLE_CURSOR, inclusive=True)}, None),
+    ("chat_messages", {"user_id": "", "timestamp": {"$gt": datetime(1970, 1, 1)}}, None),
+    (
+        "chat_archives",
+        {"user_id": "", "$or": [
+            {"session_id": "", **keyset_range("last_timestamp", before=SAMPLE_CURSOR, inclusive=True, id_field="last_id")}
+        ]},
+        None
+    ),
+] + [
+    (
+        "chat_archives",
+        {"session_id": "", "user_id": "", "$and": [
+            keyset_range("first_timestamp", before=SAMPLE_CURSOR, inclusive=True, id_field="first_id"),
+            keyset_range("last_timestamp", after=SAMPLE_CURSOR, id_field="last_id"),
+        ]},
+        [("first_timestamp", direction), ("first_id", direction)]
+    )
+    for direction in (ASCENDING, DESCENDING)
+]
+
+# Deliberate full scans by one-off background jobs: reported at startup rather than checked
+BACKGROUND_SCANS = [
+    ("users", PERSONALIZATION_BACKFILL_QUERY, "personalization_backfill, once per PERSONALIZATION_VERSION"),
+]
+
+async def find_unindexed_query_shapes() -> List[Dict[str, Any]]:
+    unindexed = []
+    for collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        stages = _plan_stages(explanation["queryPlanner"]["winningPlan"])
+        # A COLLSCAN or an in-memory SORT means the shape is not fully served by an index
+        if "COLLSCAN" in stages or "SORT" in stages:
+            unindexed.append({"collection": collection_name, "query": list(query), "sort": sort, "stages": stages})
+    return unindexed
+
+@app.on_event("startup")
+async def startup_llm_gateway():
+    global llm_gateway, response_cache
+    response_cache = ResponseCache.from_env()
+    llm_gateway = LLMGateway.from_env()
+    if llm_gateway is None:
+        logger.warning("MISTRAL_API_KEY is not set; chat routes will fail")
+    background_jobs.start()
+
+@app.on_event("startup")
+async def startup_db_client():
+    global chat_write_queue, archive_sweeper_task
+    chat_write_queue = ChatWriteQueue.from_env()
+    if chat_write_queue is not None:
+        chat_write_queue.start()
+    if ARCHIVE_AFTER_DAYS > 0:
+        archive_sweeper_task = asyncio.create_task(archive_sweeper())
+    
+    await ensure_indexes()
+    background_jobs.submit("personalization_backfill", str(PERSONALIZATION_VERSION))
+    try:
+        for shape in await find_unindexed_query_shapes():
+            logger.warning(f"Unindexed query shape on {shape['collection']}: {shape}")
+        for collection_name, query, job in BACKGROUND_SCANS:
+            logger.info(f"Background scan on {collection_name} without an index ({job}): {list(query)}")
+    except Exception as e:
+        # explain() may be unavailable (restricted roles, in-memory stand-ins); never block startup on it
+        logger.error(f"Failed to verify query plans: {str(e)}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    # Background jobs need both Mongo and the LLM gateway, so they are drained first
+    if archive_sweeper_task is not None:
+        archive_sweeper_task.cancel()
+    await background_jobs.stop()
+    # Drain queued chat writes before the connection goes away
+    if chat_write_queue is not None:
+        await chat_write_queue.stop()
+    client.close()
+
+@app.on_event("shutdown")
+async def shutdown_llm_gateway():
+    if llm_gateway is not None:
+        await llm_gateway.aclose()
+
+@app.on_event("startup")
+async def startup_cache_backend():
+    # OAuth state rides in the signed session cookie, so every worker must share one secret
+    if 'SECRET_KEY' not in os.environ:
+        logger.warning("SECRET_KEY is not set; sessions and OAuth logins only work within a single worker")
+
+@app.on_event("shutdown")
+async def shutdown_cache_backend():
+    if redis_cache_backend is not None:
+        await redis_cache_backend.aclose()
\ No newline at end of file
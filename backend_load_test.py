@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Offline Load Test & Latency Benchmark for Vimukti Mental Wellness Platform
+Drives concurrent virtual users through the FastAPI app in-process against a
+local MongoDB (or mongomock-motor with --in-memory) and a stubbed LLM gateway.
+
+Each virtual user runs: onboarding -> create session -> N chat turns -> history fetch
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any
+
+import httpx
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / 'backend'))
+
+import server  # noqa: E402
+
+RESULTS_FILE = ROOT_DIR / 'backend_load_test_results.json'
+
+SAMPLE_MESSAGES = [
+    "I feel anxious about work and can't switch off in the evenings",
+    "I can't sleep, my mind keeps racing",
+    "I had an argument with my partner and I feel awful",
+    "Thanks, that breathing exercise helped a bit",
+    "I'm overwhelmed by deadlines and feel like I'm falling behind",
+    "Some days I feel really lonely even around friends",
+]
+
+class FakeLLMGateway(server.LLMGateway):
+    """Stand-in for the Mistral gateway with configurable latency and no network"""
+
+    def __init__(self, latency: float, jitter: float, tokens: int = 40):
+        self.model = "fake"
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens = tokens
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _delay(self) -> float:
+        return max(0.0, random.gauss(self.latency, self.jitter))
+
+    async def complete(self, messages: List[Dict[str, str]], background: bool = False) -> str:
+        await asyncio.sleep(self._delay())
+        self._record_usage({
+            "prompt_tokens": sum(server.estimate_tokens(m["content"]) for m in messages),
+            "completion_tokens": self.tokens
+        })
+        return " ".join(["word"] * self.tokens)
+
+    async def stream(self, messages: List[Dict[str, str]]):
+        delay = self._delay() / self.tokens
+        for _ in range(self.tokens):
+            await asyncio.sleep(delay)
+            yield "word "
+        self._record_usage(None)
+
+    async def aclose(self):
+        pass
+
+class VimuktiLoadTester:
+    def __init__(self, args):
+        self.args = args
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+        print(f"🏋️  Vimukti Offline Load Test")
+        print(f"👥 Virtual users: {args.users} | 💬 Turns per user: {args.turns}")
+        print(f"🤖 Fake LLM latency: {args.llm_latency * 1000:.0f}ms ± {args.llm_jitter * 1000:.0f}ms")
+        print("=" * 60)
+
+    async def timed(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Issue one request and record its latency under the route name"""
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        self.latencies.setdefault(route, []).append(elapsed)
+        if response.status_code >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+    async def create_user(self) -> str:
+        """Insert a user directly, standing in for the Google OAuth callback"""
+        token = secrets.token_urlsafe(32)
+        user = server.User(email=f"load-{token[:12]}@example.com", name="Load Test", session_token=token)
+        await server.db.users.insert_one(user.dict())
+        return token
+
+    async def virtual_user(self, client: httpx.AsyncClient):
+        headers = {"Authorization": f"Bearer {await self.create_user()}"}
+
+        await self.timed(client, "POST /api/onboarding", "POST", "/api/onboarding", headers=headers, json={
+            "user_id": "load",
+            "responses": {
+                "age": str(random.randint(18, 70)),
+                "zodiacSign": random.choice(list(server.ZODIAC_TRAITS)),
+                "profession": "Engineer",
+                "mbtiType": random.choice(["INFJ", "ENTP", "ISTJ", "ESFP"])
+            },
+            "personality_archetype": "Load Tester"
+        })
+
+        response = await self.timed(client, "POST /api/chat/sessions", "POST", "/api/chat/sessions", headers=headers)
+        if response.status_code != 200:
+            return
+        session_id = response.json()["id"]
+
+        for _ in range(self.args.turns):
+            await self.timed(client, "POST /api/chat", "POST", "/api/chat", headers=headers, json={
+                "session_id": session_id,
+                "message": random.choice(SAMPLE_MESSAGES)
+            })
+
+        await self.timed(
+            client, "GET /api/chat/sessions/{id}/messages", "GET",
+            f"/api/chat/sessions/{session_id}/messages", headers=headers
+        )
+        await self.timed(client, "GET /api/chat/sessions", "GET", "/api/chat/sessions", headers=headers)
+
+    async def run(self) -> Dict[str, Any]:
+        """Start the app, run all virtual users concurrently and summarise latencies"""
+        if self.args.in_memory:
+            from mongomock_motor import AsyncMongoMockClient
+            server.client = AsyncMongoMockClient()
+            server.db = server.client[os.environ['DB_NAME']]
+
+        await server.app.router.startup()
+        if server.llm_gateway is not None:
+            await server.llm_gateway.aclose()
+        server.llm_gateway = FakeLLMGateway(self.args.llm_latency, self.args.llm_jitter)
+
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def limited(client):
+            async with semaphore:
+                await self.virtual_user(client)
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*[limited(client) for _ in range(self.args.users)])
+            wall_time = time.perf_counter() - start
+
+        await server.app.router.shutdown()
+        return self.summarise(wall_time)
+
+    def summarise(self, wall_time: float) -> Dict[str, Any]:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            values = np.array(samples) * 1000
+            routes[route] = {
+                'requests': len(samples),
+                'errors': self.errors.get(route, 0),
+                'rps': len(samples) / wall_time,
+                'p50_ms': float(np.percentile(values, 50)),
+                'p95_ms': float(np.percentile(values, 95)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'mean_ms': float(values.mean())
+            }
+
+            print(f"📊 {route}")
+            print(f"   requests: {len(samples)} | errors: {routes[route]['errors']} | rps: {routes[route]['rps']:.1f}")
+            print(f"   p50: {routes[route]['p50_ms']:.1f}ms | p95: {routes[route]['p95_ms']:.1f}ms | p99: {routes[route]['p99_ms']:.1f}ms")
+            print()
+
+        total_requests = sum(len(samples) for samples in self.latencies.values())
+        print("=" * 60)
+        print(f"⏱️  {total_requests} requests in {wall_time:.2f}s ({total_requests / wall_time:.1f} req/s)")
+
+        return {
+            'config': {
+                'users': self.args.users,
+                'concurrency': self.args.concurrency,
+                'turns': self.args.turns,
+                'llm_latency_s': self.args.llm_latency,
+                'llm_jitter_s': self.args.llm_jitter,
+                'in_memory': self.args.in_memory
+            },
+            'wall_time_s': wall_time,
+            'total_requests': total_requests,
+            'total_rps': total_requests / wall_time,
+            'routes': routes,
+            'timestamp': datetime.now().isoformat()
+        }
+
+def main():
+    """Main load test execution"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help='virtual users to run')
+    parser.add_argument('--concurrency', type=int, default=50, help='virtual users active at once')
+    parser.add_argument('--turns', type=int, default=5, help='chat turns per virtual user')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='mean fake LLM latency in seconds')
+    parser.add_argument('--llm-jitter', type=float, default=0.1, help='fake LLM latency std-dev in seconds')
+    parser.add_argument('--in-memory', action='store_true', help='use mongomock-motor instead of MONGO_URL')
+    parser.add_argument('--db-name', default='vimukti_load_test', help='database to use (dropped afterwards)')
+    parser.add_argument('--output', default=str(RESULTS_FILE), help='where to write the JSON results')
+    args = parser.parse_args()
+
+    # The app resolves DB_NAME at import time, so point it at the throwaway database here
+    os.environ['DB_NAME'] = args.db_name
+    server.db = server.client[args.db_name]
+
+    results = asyncio.run(VimuktiLoadTester(args).run())
+
+    if not args.in_memory:
+        from pymongo import MongoClient
+        MongoClient(server.mongo_url).drop_database(args.db_name)
+
+    # Save results to file
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"📁 Detailed results saved to: {args.output}")
+
+    return results
+
+if __name__ == "__main__":
+    main()
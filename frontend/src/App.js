@@ -584,13 +584,20 @@ const ChatInterface = () => {
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [currentSessionId, setCurrentSessionId] = useState(null);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const messagesEndRef = useRef(null);
+  const prependingRef = useRef(false);
 
   useEffect(() => {
-    createNewSession();
+    resumeLatestSession();
   }, []);
 
   useEffect(() => {
+    // Keep the reading position when older messages are prepended
+    if (prependingRef.current) {
+      prependingRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
@@ -605,34 +612,130 @@ const ChatInterface = () => {
       });
       setCurrentSessionId(response.data.id);
       setMessages([]);
+      setHistoryCursor(null);
     } catch (error) {
       console.error('Failed to create session:', error);
     }
   };
 
+  // History is paginated: the latest page first, then older pages via the returned cursor
+  const loadMessages = async (sessionId, before = null) => {
+    const response = await axios.get(`${API}/chat/sessions/${sessionId}/messages`, {
+      params: before ? { limit: 50, before } : { limit: 50 },
+      headers: { Authorization: `Bearer ${sessionToken}` }
+    });
+    const page = response.data.items.map(message => ({
+      role: message.role,
+      content: message.content,
+      timestamp: new Date(message.timestamp)
+    }));
+    setMessages(prev => (before ? [...page, ...prev] : page));
+    setHistoryCursor(response.data.next_cursor);
+  };
+
+  const loadEarlierMessages = async () => {
+    if (!historyCursor || !currentSessionId) return;
+    try {
+      prependingRef.current = true;
+      await loadMessages(currentSessionId, historyCursor);
+    } catch (error) {
+      prependingRef.current = false;
+      console.error('Failed to load earlier messages:', error);
+    }
+  };
+
+  const resumeLatestSession = async () => {
+    try {
+      const response = await axios.get(`${API}/chat/sessions`, {
+        params: { limit: 1 },
+        headers: { Authorization: `Bearer ${sessionToken}` }
+      });
+      const [latestSession] = response.data.items;
+      if (!latestSession) {
+        await createNewSession();
+        return;
+      }
+      setCurrentSessionId(latestSession.id);
+      await loadMessages(latestSession.id);
+    } catch (error) {
+      console.error('Failed to load chat history:', error);
+      await createNewSession();
+    }
+  };
+
   const sendMessage = async () => {
-    if (!inputMessage.trim() || !currentSessionId) return;
+    if (!inputMessage.trim() || !currentSessionId || isLoading) return;
+
+    // Lets the backend recognise retries of this exact submission
+    const idempotencyKey = window.crypto?.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
 
     const userMessage = { role: 'user', content: inputMessage, timestamp: new Date() };
     setMessages(prev => [...prev, userMessage]);
     setInputMessage('');
     setIsLoading(true);
 
+    let streamStarted = false;
     try {
-      const response = await axios.post(`${API}/chat`, {
-        session_id: currentSessionId,
-        message: inputMessage
-      }, {
-        headers: { Authorization: `Bearer ${sessionToken}` }
+      const response = await fetch(`${API}/chat/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${sessionToken}`,
+          'Idempotency-Key': idempotencyKey
+        },
+        body: JSON.stringify({
+          session_id: currentSessionId,
+          message: inputMessage
+        })
       });
+      if (!response.ok || !response.body) {
+        throw new Error(`HTTP ${response.status}`);
+      }
 
-      const assistantMessage = {
-        role: 'assistant',
-        content: response.data.message,
-        timestamp: new Date()
+      // Grow the assistant bubble as tokens arrive
+      const appendToAssistant = (text) => {
+        setMessages(prev => {
+          const updated = [...prev];
+          const last = updated[updated.length - 1];
+          updated[updated.length - 1] = { ...last, content: last.content + text };
+          return updated;
+        });
       };
-      
-      setMessages(prev => [...prev, assistantMessage]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          let eventName = 'message';
+          let data = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) eventName = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+          }
+          if (!data) continue;
+          if (eventName === 'error') {
+            throw new Error(JSON.parse(data).detail);
+          }
+          if (eventName === 'message') {
+            const content = JSON.parse(data).content;
+            if (!streamStarted) {
+              streamStarted = true;
+              setMessages(prev => [...prev, { role: 'assistant', content, timestamp: new Date() }]);
+            } else {
+              appendToAssistant(content);
+            }
+          }
+        }
+      }
     } catch (error) {
       console.error('Failed to send message:', error);
       const errorMessage = {
@@ -640,7 +743,8 @@ const ChatInterface = () => {
         content: 'I apologize, but I encountered an error. Please try again.',
         timestamp: new Date()
       };
-      setMessages(prev => [...prev, errorMessage]);
+      // Replace a partially streamed reply rather than leaving it dangling
+      setMessages(prev => [...(streamStarted ? prev.slice(0, -1) : prev), errorMessage]);
     } finally {
       setIsLoading(false);
     }
@@ -698,6 +802,17 @@ const ChatInterface = () => {
       <div className="flex-1 flex flex-col h-screen">
         <div className="flex-1 overflow-y-auto p-6">
           <div className="max-w-4xl mx-auto space-y-6">
+            {historyCursor && (
+              <div className="text-center">
+                <button
+                  onClick={loadEarlierMessages}
+                  className="text-sm text-indigo-600 hover:text-indigo-800 font-medium"
+                >
+                  Load earlier messages
+                </button>
+              </div>
+            )}
+
             {messages.length === 0 && (
               <div className="text-center py-16">
                 <VimuktiLogo className="w-16 h-16 mx-auto mb-6" />
@@ -728,7 +843,7 @@ const ChatInterface = () => {
               </div>
             ))}
             
-            {isLoading && (
+            {isLoading && messages[messages.length - 1]?.role === 'user' && (
               <div className="flex justify-start">
                 <div className="max-w-2xl px-6 py-4 rounded-2xl bg-white text-gray-900 shadow-sm border border-gray-100">
                   <div className="flex items-center space-x-2">
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import secrets
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Never run against the configured application database
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "vimukti_test")
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as server_module
+
+    try:
+        MongoClient(server_module.mongo_url, serverSelectionTimeoutMS=2000).admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable at MONGO_URL")
+    return server_module
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    """Point the app at a fresh in-memory database, for tests that run without MongoDB."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server as server_module
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server_module, "client", client)
+    monkeypatch.setattr(server_module, "db", client[os.environ["DB_NAME"]])
+    return server_module.db
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """The load test's stand-in gateway, with no network and no latency."""
+    import server as server_module
+    from backend_load_test import FakeLLMGateway
+
+    gateway = FakeLLMGateway(latency=0, jitter=0, tokens=5)
+    monkeypatch.setattr(server_module, "llm_gateway", gateway)
+    return gateway
+
+
+@pytest.fixture
+def submitted_jobs(monkeypatch):
+    """Record background job submissions instead of queueing them."""
+    import server as server_module
+
+    jobs = []
+    monkeypatch.setattr(
+        server_module.background_jobs, "submit",
+        lambda kind, key, **kwargs: jobs.append((kind, key, kwargs)) or True
+    )
+    return jobs
+
+
+@pytest.fixture
+def api(memory_db, fake_llm, submitted_jobs):
+    """An in-process HTTP client factory plus one signed-in user, all on the in-memory database."""
+    import httpx
+    import server as server_module
+
+    class Api:
+        user = server_module.User(email="api@example.com", name="Api", session_token=secrets.token_urlsafe(32))
+        headers = {"Authorization": f"Bearer {user.session_token}"}
+
+        @staticmethod
+        def client() -> httpx.AsyncClient:
+            transport = httpx.ASGITransport(app=server_module.app)
+            return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    asyncio.run(memory_db.users.insert_one(Api.user.dict()))
+    return Api
+
+
+@pytest.fixture(scope="session")
+def run(server):
+    """Run a coroutine on one shared loop so the Motor client stays bound to it."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop.run_until_complete
+    loop.run_until_complete(server.client.drop_database(os.environ["DB_NAME"]))
+    loop.close()
@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import orjson
+
+import server
+
+START = datetime(2024, 1, 1, 9, 0)
+SESSION_ID = "archived-session"
+EMOTIONS = ["anxiety", "sadness", None]
+
+
+def message(user_id, i, offset):
+    role = "user" if i % 2 == 0 else "assistant"
+    return {
+        "id": f"m{i:03d}",
+        "session_id": SESSION_ID,
+        "user_id": user_id,
+        "content": f"message {i}",
+        "role": role,
+        "emotion_detected": EMOTIONS[i % 3] if role == "user" else None,
+        # Pairs share a timestamp so chunk and page bounds fall between equal timestamps
+        "timestamp": START + timedelta(days=offset // 10, seconds=offset // 2),
+    }
+
+
+def insert_messages(db, user_id, indexes):
+    messages = [message(user_id, i, i) for i in indexes]
+    asyncio.run(db.chat_messages.insert_many([dict(m) for m in messages]))
+    return [m["id"] for m in messages]
+
+
+def setup_session(api, memory_db, monkeypatch, count):
+    monkeypatch.setattr(server, "ARCHIVE_CHUNK_MESSAGES", 4)
+    asyncio.run(memory_db.chat_sessions.insert_one({
+        "id": SESSION_ID, "user_id": api.user.id, "title": "Old", "created_at": START, "updated_at": START
+    }))
+    return insert_messages(memory_db, api.user.id, range(count))
+
+
+def archive(memory_db, user_id):
+    async def scenario():
+        session = await memory_db.chat_sessions.find_one({"id": SESSION_ID})
+        await server.archive_session(SESSION_ID, user_id, session["updated_at"])
+        return await memory_db.chat_sessions.find_one({"id": SESSION_ID})
+
+    return asyncio.run(scenario())
+
+
+def read_all(api, limit, forward=False):
+    async def scenario():
+        pages = []
+        url = f"/api/chat/sessions/{SESSION_ID}/messages"
+        async with api.client() as client:
+            params = {"limit": limit}
+            if forward:
+                params["after"] = server.encode_cursor(START - timedelta(days=1), "")
+            while True:
+                response = await client.get(url, params=params, headers=api.headers)
+                assert response.status_code == 200
+                body = response.json()
+                pages.append([item["id"] for item in body["items"]])
+                if not body["next_cursor"]:
+                    return pages
+                params = {"limit": limit, "after" if forward else "before": body["next_cursor"]}
+
+    return asyncio.run(scenario())
+
+
+def flatten_backwards(pages):
+    return [item for page in reversed(pages) for item in page]
+
+
+def test_archive_packs_bounded_chunks(api, memory_db, monkeypatch):
+    ids = setup_session(api, memory_db, monkeypatch, 10)
+    session = archive(memory_db, api.user.id)
+
+    chunks = asyncio.run(memory_db.chat_archives.find({"session_id": SESSION_ID}).sort("first_id").to_list(None))
+    assert [chunk["message_count"] for chunk in chunks] == [4, 4, 2]
+    assert [chunk["first_id"] for chunk in chunks] == [ids[0], ids[4], ids[8]]
+    assert asyncio.run(memory_db.chat_messages.count_documents({"session_id": SESSION_ID})) == 0
+    assert session["archived_at"] is not None
+    assert "archive_lease" not in session
+    assert server.decode_cursor(session["archived_until"])[1] == ids[-1]
+
+
+def test_paging_crosses_the_archive_boundary_both_ways(api, memory_db, monkeypatch):
+    ids = setup_session(api, memory_db, monkeypatch, 13)
+    archive(memory_db, api.user.id)
+    # The session is resumed after archiving
+    ids += insert_messages(memory_db, api.user.id, range(13, 20))
+
+    for limit in (1, 3, 5, 50):
+        assert flatten_backwards(read_all(api, limit)) == ids
+        assert [item for page in read_all(api, limit, forward=True) for item in page] == ids
+
+
+def test_page_reads_only_the_chunks_it_needs(api, memory_db, monkeypatch):
+    setup_session(api, memory_db, monkeypatch, 40)
+    archive(memory_db, api.user.id)
+    unpacked = []
+    decode = server.iter_archived_messages
+    monkeypatch.setattr(server, "iter_archived_messages", lambda chunk: unpacked.append(chunk) or decode(chunk))
+
+    async def page(**params):
+        unpacked.clear()
+        async with api.client() as client:
+            response = await client.get(
+                f"/api/chat/sessions/{SESSION_ID}/messages", params={"limit": 3, **params}, headers=api.headers
+            )
+        return [item["id"] for item in response.json()["items"]], len(unpacked)
+
+    # The newest page and its look-ahead sit in the last chunk of ten
+    assert asyncio.run(page()) == (["m037", "m038", "m039"], 1)
+    middle = server.encode_cursor(message(api.user.id, 21, 21)["timestamp"], "m021")
+    assert asyncio.run(page(before=middle)) == (["m018", "m019", "m020"], 2)
+    assert asyncio.run(page(after=middle)) == (["m022", "m023", "m024"], 2)
+
+
+def test_resumed_session_is_archived_again(api, memory_db, monkeypatch):
+    ids = setup_session(api, memory_db, monkeypatch, 6)
+    first = archive(memory_db, api.user.id)
+
+    # Resumed: new turns bump updated_at and clear archived_at, as save_chat_turn does
+    ids += insert_messages(memory_db, api.user.id, range(6, 11))
+    asyncio.run(memory_db.chat_sessions.update_one(
+        {"id": SESSION_ID}, {"$set": {"updated_at": START + timedelta(days=2), "archived_at": None}}
+    ))
+    # A copy left behind by an interrupted run, already covered by archived_until
+    stale = message(api.user.id, 5, 5)
+    asyncio.run(memory_db.chat_messages.insert_one(stale))
+    assert flatten_backwards(read_all(api, 4)) == ids
+
+    second = archive(memory_db, api.user.id)
+    assert second["archived_until"] > first["archived_until"]
+    assert asyncio.run(memory_db.chat_messages.count_documents({"session_id": SESSION_ID})) == 0
+    assert asyncio.run(memory_db.chat_archives.count_documents({"session_id": SESSION_ID})) == 4
+    assert flatten_backwards(read_all(api, 4)) == ids
+    assert [item for page in read_all(api, 4, forward=True) for item in page] == ids
+
+
+def test_leased_session_is_left_alone(api, memory_db, monkeypatch):
+    setup_session(api, memory_db, monkeypatch, 6)
+    asyncio.run(memory_db.chat_sessions.update_one(
+        {"id": SESSION_ID}, {"$set": {"archive_lease": datetime.utcnow() + timedelta(minutes=5)}}
+    ))
+    session = archive(memory_db, api.user.id)
+
+    assert "archived_until" not in session
+    assert asyncio.run(memory_db.chat_messages.count_documents({"session_id": SESSION_ID})) == 6
+
+
+def test_export_and_analytics_include_archived_messages(api, memory_db, monkeypatch):
+    ids = setup_session(api, memory_db, monkeypatch, 9)
+    archive(memory_db, api.user.id)
+    ids += insert_messages(memory_db, api.user.id, range(9, 12))
+
+    expected = {}
+    for m in (message(api.user.id, i, i) for i in range(12)):
+        if m["emotion_detected"]:
+            key = (m["timestamp"].strftime("%Y-%m-%d"), m["emotion_detected"])
+            expected[key] = expected.get(key, 0) + 1
+    assert asyncio.run(server.aggregate_emotion_counts(api.user.id)) == expected
+
+    async def export():
+        async with api.client() as client:
+            response = await client.get("/api/export", headers=api.headers)
+        return [orjson.loads(line) for line in response.content.splitlines()]
+
+    records = asyncio.run(export())
+    assert [record["type"] for record in records][:1] == ["session"]
+    assert [record["id"] for record in records if record["type"] == "message"] == ids
+
+
+def test_chunks_past_archived_until_are_not_counted(api, memory_db, monkeypatch):
+    setup_session(api, memory_db, monkeypatch, 6)
+
+    async def hot_messages():
+        cursor = memory_db.chat_messages.find({"session_id": SESSION_ID}, {"_id": 0, "user_id": 0})
+        return await cursor.sort([("timestamp", 1), ("id", 1)]).to_list(None)
+
+    # Another run moved archived_until on first: the chunk goes and the hot copies stay
+    messages = asyncio.run(hot_messages())[:4]
+    lines = [orjson.dumps(m) for m in messages]
+    assert asyncio.run(server.write_archive_chunk(SESSION_ID, api.user.id, "moved-on", messages, lines)) is None
+    assert asyncio.run(memory_db.chat_archives.count_documents({"session_id": SESSION_ID})) == 0
+    assert asyncio.run(memory_db.chat_messages.count_documents({"session_id": SESSION_ID})) == 6
+
+    archive(memory_db, api.user.id)
+    # Resumed, then a run stored a chunk but stopped before advancing archived_until
+    insert_messages(memory_db, api.user.id, range(6, 10))
+    stray = asyncio.run(hot_messages())
+    asyncio.run(memory_db.chat_archives.insert_one({
+        "session_id": SESSION_ID, "user_id": api.user.id,
+        "first_timestamp": stray[0]["timestamp"], "first_id": stray[0]["id"],
+        "last_timestamp": stray[-1]["timestamp"], "last_id": stray[-1]["id"],
+        "emotion_counts": server.count_emotions_by_day(stray)
+    }))
+
+    expected = {}
+    for m in (message(api.user.id, i, i) for i in range(10)):
+        if m["emotion_detected"]:
+            key = (m["timestamp"].strftime("%Y-%m-%d"), m["emotion_detected"])
+            expected[key] = expected.get(key, 0) + 1
+    assert asyncio.run(server.aggregate_emotion_counts(api.user.id)) == expected
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import secrets
+from datetime import datetime
+
+import pytest
+from starlette.requests import Request
+
+import server
+
+
+def request_for(token):
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+def insert_user(db, **fields):
+    token = secrets.token_urlsafe(32)
+    user = server.User(email=f"{token[:8]}@example.com", name="Auth", session_token=token, **fields)
+    document = user.dict()
+    document["personalization"] = server.compile_personalization("29", "Leo", None, None).model_dump()
+    asyncio.run(db.users.insert_one(document))
+    return token, user
+
+
+def test_cache_hit_matches_the_database_read(memory_db):
+    token, user = insert_user(memory_db, age="29")
+
+    async def scenario():
+        first = await server.get_current_user(request_for(token))
+        # Served from the cache from here on
+        await memory_db.users.delete_one({"id": user.id})
+        second = await server.get_current_user(request_for(token))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second == first
+    assert second.id == user.id
+    assert second.session_token is None
+    assert isinstance(second.created_at, datetime)
+    assert isinstance(second.personalization, server.Personalization)
+    assert isinstance(second.personalization.compiled_at, datetime)
+    assert server.create_personalized_system_message(second) == server.create_personalized_system_message(first)
+
+
+def test_documents_are_not_revalidated_on_either_path(memory_db):
+    token, user = insert_user(memory_db)
+    # A profile value stored before onboarding answers were validated
+    asyncio.run(memory_db.users.update_one({"id": user.id}, {"$set": {"age": 29}}))
+
+    async def scenario():
+        return [await server.get_current_user(request_for(token)) for _ in range(2)]
+
+    miss, hit = asyncio.run(scenario())
+    assert miss.age == hit.age == 29
+
+
+def test_shared_cache_keys_do_not_contain_tokens(memory_db, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(server, "user_cache", server.CacheNamespace(
+        server.RedisCacheBackend(redis, "vimukti_test"), "auth", ttl=60
+    ))
+    token, _ = insert_user(memory_db)
+
+    async def scenario():
+        await server.get_current_user(request_for(token))
+        return await redis.keys("*")
+
+    keys = [key.decode() for key in asyncio.run(scenario())]
+    assert keys == [f"vimukti_test:auth:{server.auth_cache_key(token)}"]
+    assert token not in keys[0]
+
+
+def test_auth_entries_have_their_own_capacity():
+    if server.redis_cache_backend is not None:
+        pytest.skip("namespaces share Redis when REDIS_URL is set")
+    assert server.user_cache.backend is not server.chat_rate_counters.backend
+    assert server.user_cache.backend.maxsize == int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", 10000))
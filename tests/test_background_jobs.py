@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import server
+
+
+def pool(**overrides):
+    settings = {"workers": 2, "max_queue": 10, "max_retries": 2, "retry_delay": 0.01}
+    settings.update(overrides)
+    return server.BackgroundWorkerPool(**settings)
+
+
+async def settle(jobs, until):
+    for _ in range(200):
+        if until():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(jobs.stats())
+
+
+def test_jobs_are_coalesced_while_pending():
+    jobs = pool()
+    runs = []
+
+    def handler(kind):
+        async def run(session_id, name):
+            runs.append(name)
+            # A job cannot queue itself again while it runs
+            assert not jobs.submit(kind, session_id, session_id=session_id, name="again")
+        return run
+
+    jobs.register("title", handler("title"))
+    jobs.register("summary", handler("summary"))
+
+    async def scenario():
+        assert jobs.submit("title", "s1", session_id="s1", name="first")
+        assert not jobs.submit("title", "s1", session_id="s1", name="duplicate")
+        assert jobs.submit("title", "s2", session_id="s2", name="other")
+        assert jobs.submit("summary", "s1", session_id="s1", name="other kind")
+        assert jobs.stats()["pending"] == 3
+
+        jobs.start()
+        await settle(jobs, lambda: jobs.completed == 3)
+        assert jobs.stats()["pending"] == 0
+        # Finished, so the same key can run again
+        assert jobs.submit("title", "s1", session_id="s1", name="later")
+        await jobs.stop()
+
+    asyncio.run(scenario())
+    assert sorted(runs) == ["first", "later", "other", "other kind"]
+    assert jobs.failed == jobs.retries == 0
+
+
+def test_failed_jobs_retry_with_backoff():
+    jobs = pool(max_retries=3)
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError("try again")
+
+    jobs.register("flaky", flaky)
+
+    async def scenario():
+        jobs.start()
+        jobs.submit("flaky", "k")
+        await settle(jobs, lambda: jobs.completed == 1)
+        await jobs.stop()
+
+    asyncio.run(scenario())
+    stats = jobs.stats()
+    assert (stats["retries"], stats["completed"], stats["failed"], stats["pending"]) == (2, 1, 0, 0)
+    first_gap, second_gap = attempts[1] - attempts[0], attempts[2] - attempts[1]
+    assert first_gap >= 0.01 and second_gap >= 0.02
+
+
+def test_pending_key_is_released_after_the_final_failure():
+    jobs = pool(max_retries=1)
+    coalesced_during_retry = []
+
+    async def broken():
+        coalesced_during_retry.append(not jobs.submit("broken", "k"))
+        raise RuntimeError("always")
+
+    jobs.register("broken", broken)
+
+    async def scenario():
+        jobs.start()
+        jobs.submit("broken", "k")
+        await settle(jobs, lambda: jobs.failed == 1)
+        assert jobs.stats()["pending"] == 0
+        assert jobs.submit("broken", "k")
+        await settle(jobs, lambda: jobs.failed == 2)
+        await jobs.stop()
+
+    asyncio.run(scenario())
+    assert coalesced_during_retry == [True] * 4
+    assert jobs.stats()["retries"] == 2
+
+
+def test_full_queue_drops_jobs():
+    jobs = pool(max_queue=1)
+    assert jobs.submit("title", "s1")
+    assert not jobs.submit("title", "s2")
+    assert jobs.stats()["dropped"] == 1
+    assert jobs.stats()["depth"] == 1
+
+
+def test_stop_drains_queued_jobs():
+    jobs = pool(workers=1)
+    done = []
+
+    async def slow(n):
+        await asyncio.sleep(0.01)
+        done.append(n)
+
+    jobs.register("slow", slow)
+
+    async def scenario():
+        for n in range(5):
+            jobs.submit("slow", str(n), n=n)
+        jobs.start()
+        await jobs.stop(timeout=5)
+        await asyncio.sleep(0)
+        return [task for task in jobs._tasks if not task.done()]
+
+    assert asyncio.run(scenario()) == []
+    assert done == [0, 1, 2, 3, 4]
+    assert jobs.stats()["depth"] == 0
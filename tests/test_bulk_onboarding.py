@@ -0,0 +1,71 @@
+import asyncio
+
+import orjson
+import pytest
+
+import server
+
+ADMIN_KEY = "test-admin-key"
+
+
+@pytest.fixture
+def admin(api, monkeypatch):
+    monkeypatch.setenv("ADMIN_API_KEY", ADMIN_KEY)
+    monkeypatch.setattr(server, "BULK_ONBOARDING_CHUNK", 2)
+    other = server.User(email="other@example.com", name="Other")
+    asyncio.run(server.db.users.insert_one(other.dict()))
+    return other
+
+
+def record(user_id, **responses):
+    return orjson.dumps({"user_id": user_id, "responses": responses, "personality_archetype": "explorer"})
+
+
+def test_bulk_onboarding(api, admin):
+    body = b"\n".join([
+        record(api.user.id, age=29, profession="Designer"),
+        b"{not json",
+        record(admin.id, age={"years": 29}),
+        record("missing-user", age="40"),
+        record(admin.id, profession="Teacher"),
+        b"",
+        record(admin.id, profession="Nurse", zodiacSign=None),
+    ])
+
+    async def scenario():
+        async with api.client() as client:
+            # Caches the signed-in user's profile before the bulk update
+            assert (await client.get("/api/auth/profile", headers=api.headers)).json()["age"] is None
+            response = await client.post(
+                "/api/admin/onboarding/bulk", content=body, headers={"X-Admin-Key": ADMIN_KEY}
+            )
+            profile = (await client.get("/api/auth/profile", headers=api.headers)).json()
+        other = await server.db.users.find_one({"id": admin.id})
+        return response, profile, other
+
+    response, profile, other = asyncio.run(scenario())
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["received"], result["applied"], result["failed"]) == (6, 3, 3)
+    assert [(error["line"], error["user_id"]) for error in result["errors"]] == [
+        (2, None), (3, None), (4, "missing-user")
+    ]
+    assert "age must be a string" in result["errors"][1]["error"]
+
+    # The cached profile was invalidated and the numeric age stored as a string
+    assert profile["age"] == "29"
+    assert profile["profession"] == "Designer"
+    # Later records for the same user win
+    assert other["profession"] == "Nurse"
+    assert other["zodiac_sign"] is None
+    assert other["onboarding_completed"]
+
+
+def test_bulk_onboarding_requires_the_admin_key(api, admin):
+    async def scenario():
+        async with api.client() as client:
+            return await client.post(
+                "/api/admin/onboarding/bulk", content=record(admin.id, age="30"), headers={"X-Admin-Key": "wrong"}
+            )
+
+    assert asyncio.run(scenario()).status_code == 401
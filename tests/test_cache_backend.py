@@ -0,0 +1,110 @@
+import asyncio
+
+import orjson
+import pytest
+
+import server
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture(params=["in_process", "redis"])
+def backend(request):
+    if request.param == "redis":
+        return server.RedisCacheBackend(fakeredis.FakeAsyncRedis(), "vimukti_test")
+    return server.InProcessCacheBackend(maxsize=100)
+
+
+def test_backends_must_implement_the_interface():
+    with pytest.raises(TypeError):
+        server.CacheBackend()
+
+
+def test_get_set_delete(backend):
+    async def scenario():
+        assert await backend.get("missing") is None
+        await backend.set("key", b"value", ttl=60)
+        assert await backend.get("key") == b"value"
+        await backend.delete("key")
+        assert await backend.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire(backend):
+    async def scenario():
+        await backend.set("key", b"value", ttl=0.05)
+        await asyncio.sleep(0.1)
+        assert await backend.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_counters_keep_their_window(backend):
+    async def scenario():
+        assert [await backend.incr("counter", ttl=0.2) for _ in range(3)] == [1, 2, 3]
+        await asyncio.sleep(0.3)
+        assert await backend.incr("counter", ttl=0.2) == 1
+
+    asyncio.run(scenario())
+
+
+def test_workers_share_cached_users(backend):
+    # Two namespaces over one backend stand in for two workers
+    first = server.CacheNamespace(backend, "auth", ttl=60)
+    second = server.CacheNamespace(backend, "auth", ttl=60)
+    user = server.User(
+        email="cache@example.com", name="Cache", age="30",
+        personalization=server.compile_personalization("30", "Leo", None, None)
+    )
+    # Stored the way get_current_user does: the projected Mongo document as orjson
+    document = user.model_dump(exclude={"session_token"})
+
+    async def scenario():
+        await first.set("token", orjson.dumps(document))
+        cached = server.construct_user(orjson.loads(await second.get("token")))
+        assert cached == user
+        assert server.create_personalized_system_message(cached) == server.create_personalized_system_message(user)
+        await second.delete("token")
+        assert await first.get("token") is None
+
+    asyncio.run(scenario())
+
+
+def test_response_cache_is_shared_through_the_backend(backend):
+    def response_cache():
+        return server.ResponseCache(
+            server.CacheNamespace(backend, "openers", ttl=60), threshold=0.8, max_entries_per_profile=4, max_profiles=10
+        )
+
+    writer, reader = response_cache(), response_cache()
+    fingerprint = ("30", "Leo", None, None)
+
+    async def scenario():
+        await writer.add(fingerprint, "I feel anxious", "Let's slow down together.")
+        assert await reader.lookup(fingerprint, "i feel so anxious!") == "Let's slow down together."
+        assert await reader.lookup(fingerprint, "My dog died") is None
+        assert await reader.lookup(("40", None, None, None), "I feel anxious") is None
+
+        for i in range(5):
+            await writer.add(fingerprint, f"opener number {i}", f"reply {i}")
+        assert await reader.lookup(fingerprint, "I feel anxious") is None
+        assert await reader.lookup(fingerprint, "opener number 4") == "reply 4"
+
+    asyncio.run(scenario())
+
+
+def test_response_cache_keeps_one_entry_per_profile(backend):
+    cache = server.ResponseCache(
+        server.CacheNamespace(backend, "openers", ttl=60), threshold=0.8, max_entries_per_profile=1, max_profiles=10
+    )
+    fingerprint = ("30", "Leo", None, None)
+
+    async def scenario():
+        for opener in ["I feel anxious", "My dog died", "Work is overwhelming"]:
+            await cache.add(fingerprint, opener, f"reply to {opener}")
+        index = await cache._load(fingerprint)
+        assert index.texts == ["work is overwhelming"]
+        assert await cache.lookup(fingerprint, "I feel anxious") is None
+
+    asyncio.run(scenario())
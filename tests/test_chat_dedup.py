@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+import server
+
+
+def chat(api, session_id, message, idempotency_key=None):
+    headers = dict(api.headers)
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    return {"json": {"session_id": session_id, "message": message}, "headers": headers}
+
+
+async def count_messages(session_id):
+    return await server.db.chat_messages.count_documents({"session_id": session_id})
+
+
+def test_concurrent_duplicates_share_one_turn(api):
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        async with api.client() as client:
+            first, second = await asyncio.gather(
+                client.post("/api/chat", **chat(api, session_id, "yes")),
+                client.post("/api/chat", **chat(api, session_id, "yes"))
+            )
+        return first, second, await count_messages(session_id)
+
+    first, second, messages = asyncio.run(scenario())
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert messages == 2
+
+
+def test_repeated_message_after_completion_is_a_new_turn(api):
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        async with api.client() as client:
+            for _ in range(2):
+                assert (await client.post("/api/chat", **chat(api, session_id, "yes"))).status_code == 200
+        return await count_messages(session_id)
+
+    assert asyncio.run(scenario()) == 4
+
+
+def test_different_idempotency_keys_are_different_turns(api):
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        async with api.client() as client:
+            await client.post("/api/chat", **chat(api, session_id, "yes", "k1"))
+            await client.post("/api/chat", **chat(api, session_id, "yes", "k2"))
+        return await count_messages(session_id)
+
+    assert asyncio.run(scenario()) == 4
+
+
+def test_idempotency_key_replays_its_reply(api, fake_llm):
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        async with api.client() as client:
+            first = await client.post("/api/chat", **chat(api, session_id, "I feel anxious", "k1"))
+            retry = await client.post("/api/chat", **chat(api, session_id, "I feel anxious", "k1"))
+        return first, retry, await count_messages(session_id)
+
+    first, retry, messages = asyncio.run(scenario())
+    assert retry.json() == first.json()
+    assert messages == 2
+    assert fake_llm.requests == 1
+
+
+def test_idempotency_key_reused_for_another_message_is_rejected(api):
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        async with api.client() as client:
+            await client.post("/api/chat", **chat(api, session_id, "I feel anxious", "k1"))
+            return await client.post("/api/chat", **chat(api, session_id, "Something else", "k1"))
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 422
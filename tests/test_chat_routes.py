@@ -0,0 +1,53 @@
+import asyncio
+import uuid
+
+import orjson
+
+import server
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = block.split("\n")
+        event = next((line[len("event: "):] for line in lines if line.startswith("event: ")), "message")
+        data = next(line[len("data: "):] for line in lines if line.startswith("data: "))
+        events.append((event, orjson.loads(data)))
+    return events
+
+
+def test_both_routes_persist_a_turn_and_title_the_session(api, submitted_jobs):
+    plain, streamed = str(uuid.uuid4()), str(uuid.uuid4())
+
+    async def scenario():
+        async with api.client() as client:
+            reply = await client.post(
+                "/api/chat", json={"session_id": plain, "message": "I feel anxious"}, headers=api.headers
+            )
+            stream = await client.post(
+                "/api/chat/stream", json={"session_id": streamed, "message": "I feel anxious"}, headers=api.headers
+            )
+        counts = [await server.db.chat_messages.count_documents({"session_id": s}) for s in (plain, streamed)]
+        return reply, stream, counts
+
+    reply, stream, counts = asyncio.run(scenario())
+    assert reply.status_code == stream.status_code == 200
+    events = sse_events(stream.text)
+    content = "".join(data["content"] for event, data in events if event == "message")
+    done = [data for event, data in events if event == "done"]
+
+    assert done == [{"message": content, "emotion_detected": "anxiety", "session_id": streamed}]
+    assert reply.json()["emotion_detected"] == "anxiety"
+    assert counts == [2, 2]
+    assert [(kind, key) for kind, key, _ in submitted_jobs] == [("title", plain), ("title", streamed)]
+
+
+def test_stream_releases_its_admission_slot(api):
+    async def scenario():
+        async with api.client() as client:
+            await client.post(
+                "/api/chat/stream", json={"session_id": str(uuid.uuid4()), "message": "hello"}, headers=api.headers
+            )
+
+    asyncio.run(scenario())
+    assert server.llm_admission.stats()["inflight"] == 0
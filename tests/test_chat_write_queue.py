@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+
+from pymongo.errors import AutoReconnect
+
+import server
+
+
+def make_queue(**overrides):
+    settings = {"maxsize": 100, "batch_size": 3, "flush_interval": 0.05, "max_retries": 2}
+    settings.update(overrides)
+    return server.ChatWriteQueue(**settings)
+
+
+async def save_turns(session_id, count):
+    for i in range(count):
+        await server.save_chat_turn(session_id, "user-1", f"message {i}", f"reply {i}")
+
+
+def test_writes_are_batched(memory_db, monkeypatch):
+    queue = make_queue()
+    monkeypatch.setattr(server, "chat_write_queue", queue)
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        queue.start()
+        await save_turns(session_id, 7)
+        await queue.stop()
+        return await memory_db.chat_messages.count_documents({"session_id": session_id})
+
+    assert asyncio.run(scenario()) == 14
+    assert queue.stats()["batches_written"] == 3
+    assert queue.stats()["writes_written"] == 7
+
+
+def test_failed_batch_is_retried_without_duplicating_messages(memory_db, monkeypatch):
+    queue = make_queue()
+    monkeypatch.setattr(server, "chat_write_queue", queue)
+    write_chat_batch = server.write_chat_batch
+    calls = []
+
+    # The messages land but the session upsert fails, so the retry replays inserts that already exist
+    async def flaky_write(writes):
+        calls.append(len(writes))
+        if len(calls) == 1:
+            await server._insert_messages([message for write in writes for message in write.messages])
+            raise AutoReconnect("primary stepped down")
+        await write_chat_batch(writes)
+
+    monkeypatch.setattr(server, "write_chat_batch", flaky_write)
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        queue.start()
+        await save_turns(session_id, 1)
+        await queue.stop()
+        messages = await memory_db.chat_messages.count_documents({"session_id": session_id})
+        session = await memory_db.chat_sessions.find_one({"id": session_id})
+        return messages, session
+
+    messages, session = asyncio.run(scenario())
+    assert calls == [1, 1]
+    assert messages == 2
+    assert session["title"] == "message 0"
+    assert queue.stats()["retries"] == 1
+    assert queue.stats()["writes_dropped"] == 0
+
+
+def test_batch_is_dropped_after_max_retries(memory_db, monkeypatch):
+    queue = make_queue(max_retries=1)
+    monkeypatch.setattr(server, "chat_write_queue", queue)
+
+    async def failing_write(writes):
+        raise AutoReconnect("no primary")
+
+    monkeypatch.setattr(server, "write_chat_batch", failing_write)
+
+    async def scenario():
+        queue.start()
+        await save_turns(str(uuid.uuid4()), 2)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert queue.stats()["retries"] == 1
+    assert queue.stats()["writes_dropped"] == 2
+
+
+def test_stop_drains_queued_writes(memory_db, monkeypatch):
+    queue = make_queue(batch_size=100)
+    monkeypatch.setattr(server, "chat_write_queue", queue)
+    session_id = str(uuid.uuid4())
+
+    async def scenario():
+        queue.start()
+        await save_turns(session_id, 5)
+        assert queue.stats()["depth"] == 5
+        await queue.stop()
+        return await memory_db.chat_messages.count_documents({"session_id": session_id})
+
+    assert asyncio.run(scenario()) == 10
+    assert queue.stats()["depth"] == 0
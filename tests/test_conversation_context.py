@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+START = datetime(2024, 5, 1, 9, 0)
+SESSION_ID = "context-session"
+
+
+@pytest.fixture
+def context(memory_db, fake_llm, submitted_jobs, monkeypatch):
+    monkeypatch.setattr(server, "conversation_states", None)
+    monkeypatch.setattr(server, "CONTEXT_MAX_TURNS", 3)
+    monkeypatch.setattr(server, "CONTEXT_SUMMARY_BATCH", 4)
+    monkeypatch.setattr(server, "CONTEXT_TOKEN_BUDGET", 100000)
+    asyncio.run(memory_db.chat_sessions.insert_one({"id": SESSION_ID, "user_id": "u1", "summary": None, "summary_cursor": None}))
+    return memory_db
+
+
+def insert_messages(db, count, start=0, content="message {i}"):
+    messages = [
+        {
+            "id": f"m{i:03d}",
+            "session_id": SESSION_ID,
+            "user_id": "u1",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": content.format(i=i),
+            "timestamp": START + timedelta(seconds=i),
+        }
+        for i in range(start, start + count)
+    ]
+    asyncio.run(db.chat_messages.insert_many(messages))
+    return [message["content"] for message in messages]
+
+
+def build(user_text="hello"):
+    return asyncio.run(server.build_conversation_context(SESSION_ID, "u1", "You are kind.", user_text))
+
+
+def session(db):
+    return asyncio.run(db.chat_sessions.find_one({"id": SESSION_ID}))
+
+
+def test_unsummarised_turns_stay_in_history(context):
+    # Three turns of window plus three messages short of a summary batch
+    contents = insert_messages(context, 9)
+    result = build()
+
+    assert [message["content"] for message in result.history] == contents
+    assert not result.first_turn
+
+
+def test_oldest_turns_are_trimmed_to_the_token_budget(context, monkeypatch):
+    insert_messages(context, 6, content="{i} " + "x" * 400)
+    fixed = server.estimate_tokens("You are kind.") + server.estimate_tokens("hello")
+    monkeypatch.setattr(server, "CONTEXT_TOKEN_BUDGET", fixed + 2 * server.estimate_tokens("0 " + "x" * 400))
+    result = build()
+
+    assert [message["content"][:1] for message in result.history] == ["4", "5"]
+    assert result.prompt_tokens <= server.CONTEXT_TOKEN_BUDGET
+
+
+def test_summary_waits_for_a_full_batch(context, submitted_jobs):
+    contents = insert_messages(context, 6 + 3)
+    assert [message["content"] for message in build().history] == contents
+    assert submitted_jobs == []
+
+    contents += insert_messages(context, 1, start=9)
+    # Still verbatim until the job has folded them
+    assert [message["content"] for message in build().history] == contents
+    assert submitted_jobs == [("summary", SESSION_ID, {
+        "session_id": SESSION_ID, "user_id": "u1", "summary": None, "summary_cursor": None
+    })]
+
+
+def test_fold_summarises_the_oldest_batch_from_the_cursor(context, fake_llm, monkeypatch):
+    insert_messages(context, 10)
+    prompts = []
+    complete = fake_llm.complete
+
+    async def recording(messages, background=False):
+        prompts.append(messages[-1]["content"])
+        return await complete(messages, background)
+
+    monkeypatch.setattr(fake_llm, "complete", recording)
+
+    asyncio.run(server.fold_into_summary(SESSION_ID, "u1", None, None))
+    first = session(context)
+    assert "message 3" in prompts[0] and "message 4" not in prompts[0]
+    assert server.decode_cursor(first["summary_cursor"])[1] == "m003"
+
+    # A stale job for the old cursor must not overwrite the newer summary
+    asyncio.run(server.fold_into_summary(SESSION_ID, "u1", None, None))
+    assert session(context)["summary_cursor"] == first["summary_cursor"]
+
+    asyncio.run(server.fold_into_summary(SESSION_ID, "u1", first["summary"], first["summary_cursor"]))
+    second = session(context)
+    assert "message 4" in prompts[-1] and "message 3" not in prompts[-1] and "message 8" not in prompts[-1]
+    assert server.decode_cursor(second["summary_cursor"])[1] == "m007"
+
+    # Two messages left is less than a batch, so nothing is folded
+    calls = len(prompts)
+    asyncio.run(server.fold_into_summary(SESSION_ID, "u1", second["summary"], second["summary_cursor"]))
+    assert len(prompts) == calls
+    assert session(context)["summary_cursor"] == second["summary_cursor"]
+
+    # The context now only reads what the summary does not cover
+    result = build()
+    assert [message["content"] for message in result.history] == ["message 8", "message 9"]
+    assert second["summary"] in result.system_message
+
+
+def test_fold_reads_archived_messages(context, monkeypatch):
+    insert_messages(context, 10)
+    asyncio.run(context.chat_sessions.update_one({"id": SESSION_ID}, {"$set": {"updated_at": START}}))
+    asyncio.run(server.archive_session(SESSION_ID, "u1", START))
+    assert asyncio.run(context.chat_messages.count_documents({})) == 0
+
+    asyncio.run(server.fold_into_summary(SESSION_ID, "u1", None, None))
+    assert server.decode_cursor(session(context)["summary_cursor"])[1] == "m003"
+
+
+def test_first_turn(context):
+    assert build().first_turn
+
+    asyncio.run(context.chat_sessions.update_one({"id": SESSION_ID}, {"$set": {"summary": "Earlier talk."}}))
+    assert not build().first_turn
@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timedelta
+
+import server
+
+
+def store(**overrides):
+    settings = {"max_sessions": 3, "max_bytes": 1 << 20, "idle_ttl": 60, "max_messages": 4}
+    settings.update(overrides)
+    return server.ConversationStateStore(**settings)
+
+
+def state(user_id="u1", messages=None, summary_cursor=None):
+    return server.ConversationState(user_id, None, summary_cursor, messages or [])
+
+
+def message(n, content="hello"):
+    return {"id": f"m{n}", "role": "user", "content": content, "timestamp": datetime(2024, 1, 1) + timedelta(minutes=n)}
+
+
+def test_least_recently_used_session_is_evicted():
+    states = store(max_sessions=2)
+    states.put("s1", state())
+    states.put("s2", state())
+    assert states.get("s1", "u1") is not None
+
+    states.put("s3", state())
+    assert states.get("s2", "u1") is None
+    assert states.get("s1", "u1") is not None and states.get("s3", "u1") is not None
+    assert states.stats()["evictions"] == 1
+
+
+def test_idle_sessions_go_first():
+    states = store()
+    states.put("s1", state())
+    states.put("s2", state())
+    states.get("s1", "u1")
+    states._states["s1"].last_used = time.monotonic() - 120
+
+    states.put("s3", state())
+    assert list(states._states) == ["s2", "s3"]
+    assert states.get("s1", "u1") is None
+
+
+def test_byte_cap_evicts_until_under_budget():
+    big = [message(0, "x" * 1000)]
+    states = store(max_sessions=10, max_bytes=2 * state(messages=big).estimate_size() + 100)
+    for session_id in ("s1", "s2", "s3"):
+        states.put(session_id, state(messages=list(big)))
+
+    assert list(states._states) == ["s2", "s3"]
+    assert states.bytes == sum(s.size for s in states._states.values()) <= states.max_bytes
+
+
+def test_other_users_never_see_the_state():
+    states = store()
+    states.put("s1", state())
+    assert states.get("s1", "u2") is None
+    assert states.stats()["sessions"] == 0
+
+
+def test_append_keeps_the_loaded_window():
+    states = store(max_messages=3)
+    states.put("s1", state(messages=[message(0), message(1)]))
+    now = datetime(2024, 1, 2, 12, 0, 0, 123456)
+    replies = [
+        server.ChatMessage(id=f"r{n}", session_id="s1", user_id="u1", content="reply", role="assistant", timestamp=now)
+        for n in range(2)
+    ]
+    states.append("s1", replies)
+
+    messages = states.get("s1", "u1").messages
+    assert [m["id"] for m in messages] == ["m1", "r0", "r1"]
+    # Millisecond precision, as Mongo would hand it back
+    assert messages[-1]["timestamp"].microsecond == 123000
+    states.append("missing", replies)
+    assert "missing" not in states._states
+
+
+def test_summary_drops_folded_turns():
+    states = store()
+    states.put("s1", state(messages=[message(n) for n in range(4)]))
+    size = states.bytes
+    folded = states._states["s1"].messages[1]
+    states.apply_summary("s1", None, "they talked", server.encode_cursor(folded["timestamp"], folded["id"]))
+
+    current = states.get("s1", "u1")
+    assert [m["id"] for m in current.messages] == ["m2", "m3"]
+    assert current.summary == "they talked"
+    assert states.bytes == current.size < size
+
+
+def test_stale_summary_is_ignored():
+    cursor = server.encode_cursor(datetime(2024, 1, 1), "m0")
+    states = store()
+    states.put("s1", state(messages=[message(n) for n in range(4)], summary_cursor=cursor))
+
+    # Another summary landed first; this one was built from an older cursor
+    states.apply_summary("s1", None, "stale", server.encode_cursor(datetime(2024, 1, 1, 0, 2), "m2"))
+    current = states.get("s1", "u1")
+    assert current.summary is None and current.summary_cursor == cursor
+    assert len(current.messages) == 4
@@ -0,0 +1,35 @@
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize("text, emotion", [
+    ("I feel anxious about tomorrow", "anxiety"),
+    ("I can't sleep", "stress"),
+    ("I cant sleep again", "stress"),
+    ("I cannot sleep", "stress"),
+    ("I can not sleep at all", "stress"),
+    ("I've been feeling down all week", "sadness"),
+    ("I felt so blue yesterday", "sadness"),
+    ("I'm going down to the store", "neutral"),
+    ("My favourite colour is blue", "neutral"),
+    ("I am not happy", "sadness"),
+    ("I'm not worried about it", "neutral"),
+    ("I'm not feeling down today", "neutral"),
+    ("I'm so angry and frustrated", "anger"),
+    ("I'm scared of what comes next", "fear"),
+    ("Nobody calls me anymore and I feel lonely", "loneliness"),
+    ("I'm worried, stressed and overwhelmed", "stress"),
+    ("I'm anxious but hopeful", "anxiety"),
+    ("That went really well, I'm proud of myself", "joy"),
+    ("Thank you, that helped", "gratitude"),
+    ("What should I cook tonight?", "neutral"),
+    ("", "neutral"),
+])
+def test_detect_emotion(text, emotion):
+    assert server.detect_emotion(text) == emotion
+
+
+def test_detect_emotions_keeps_order():
+    texts = ["I cannot sleep", "going down the hall", "I'm grateful"]
+    assert server.detect_emotions(texts) == ["stress", "neutral", "gratitude"]
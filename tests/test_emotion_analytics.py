@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import server
+
+
+def day(offset):
+    return (datetime.utcnow().date() - timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def test_rolling_trend_ignores_quiet_days():
+    # Active on three of the last seven days, always half joy
+    counts = {}
+    for offset in (6, 4, 1):
+        counts[(day(offset), "joy")] = 1
+        counts[(day(offset), "sadness")] = 1
+    report = server.build_emotion_report(counts, days=10)
+
+    assert report["trends"]["joy"]["rolling_7d"] == [None, None, None] + [0.5] * 7
+    assert [row["total"] for row in report["daily"]] == [0, 0, 0, 2, 0, 2, 0, 0, 2, 0]
+    assert report["trends"]["joy"]["slope_per_day"] == 0
+
+
+def test_rolling_trend_pools_counts_across_the_window():
+    counts = {(day(2), "joy"): 3, (day(2), "sadness"): 1, (day(0), "sadness"): 2}
+    trend = server.build_emotion_report(counts, days=7)["trends"]
+
+    # Today's window holds 3 joy out of 6 messages, not the mean of 0.75 and 0
+    assert trend["joy"]["rolling_7d"][-3:] == [0.75, 0.75, 0.5]
+    assert trend["sadness"]["rolling_7d"][-1] == 0.5
+
+
+def insert_emotion(db, user_id, emotion, timestamp):
+    asyncio.run(db.chat_messages.insert_one({
+        "id": str(uuid.uuid4()), "session_id": "s1", "user_id": user_id, "role": "user",
+        "content": emotion, "emotion_detected": emotion, "timestamp": timestamp
+    }))
+
+
+def test_cached_counts_merge_settled_deltas_once(api, memory_db, monkeypatch):
+    user_id = api.user.id
+    now = datetime.utcnow()
+    monkeypatch.setattr(server, "ANALYTICS_SETTLE_SECONDS", 300)
+    monkeypatch.setattr(server, "emotion_analytics_cache", server.TTLCache(maxsize=10, ttl=3600))
+    windows = []
+    aggregate = server.aggregate_emotion_counts
+
+    async def recording(user_id, since=None, until=None):
+        windows.append((since, until))
+        return await aggregate(user_id, since=since, until=until)
+
+    monkeypatch.setattr(server, "aggregate_emotion_counts", recording)
+    joy, sadness = now - timedelta(hours=1), now - timedelta(minutes=1)
+    insert_emotion(memory_db, user_id, "joy", joy)
+    insert_emotion(memory_db, user_id, "sadness", sadness)
+    joy_key, sadness_key = (joy.strftime("%Y-%m-%d"), "joy"), (sadness.strftime("%Y-%m-%d"), "sadness")
+    assert asyncio.run(server.get_emotion_counts(user_id)) == {joy_key: 1, sadness_key: 1}
+    settled = server.emotion_analytics_cache.get(user_id)
+    assert settled["counts"] == {joy_key: 1}
+
+    # The settle point moves past the sadness message: it joins the cached counts through a delta
+    monkeypatch.setattr(server, "ANALYTICS_SETTLE_SECONDS", 0)
+    windows.clear()
+    late = datetime.utcnow() + timedelta(minutes=1)
+    insert_emotion(memory_db, user_id, "joy", late)
+    expected = {joy_key: 1, sadness_key: 1}
+    expected[(late.strftime("%Y-%m-%d"), "joy")] = expected.get((late.strftime("%Y-%m-%d"), "joy"), 0) + 1
+    assert asyncio.run(server.get_emotion_counts(user_id)) == expected
+    assert windows[0][0] == settled["settled_until"]
+    assert server.emotion_analytics_cache.get(user_id)["counts"] == {joy_key: 1, sadness_key: 1}
+
+    async def report():
+        async with api.client() as client:
+            return await client.get("/api/analytics/emotions", params={"days": 7}, headers=api.headers)
+
+    response = asyncio.run(report())
+    assert response.status_code == 200
+    assert sum(row["total"] for row in response.json()["daily"]) == 3
+    assert response.json()["trends"]["joy"]["rolling_7d"][-1] == round(2 / 3, 4)
@@ -0,0 +1,76 @@
+import gzip
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+
+MESSAGES = 200_000
+BATCH = 10_000
+
+
+def insert_history(server, run, user_id):
+    session_id = str(uuid.uuid4())
+    start = datetime.utcnow() - timedelta(days=30)
+    run(server.db.chat_sessions.insert_one(
+        server.ChatSession(id=session_id, user_id=user_id, title="Export", created_at=start).dict()
+    ))
+
+    for offset in range(0, MESSAGES, BATCH):
+        run(server.db.chat_messages.insert_many([
+            {
+                "id": str(uuid.uuid4()),
+                "session_id": session_id,
+                "user_id": user_id,
+                "content": f"Synthetic message {i} about how the week has been going and what helped",
+                "role": "user" if i % 2 == 0 else "assistant",
+                "emotion_detected": "anxiety" if i % 2 == 0 else None,
+                "timestamp": start + timedelta(seconds=i),
+            }
+            for i in range(offset, offset + BATCH)
+        ]))
+
+
+def export(server, run, user_id, compress):
+    async def consume():
+        size = 0
+        first = None
+        async for chunk in server.export_user_history(user_id, compress=compress):
+            size += len(chunk)
+            first = first or chunk
+        return size, first
+
+    return run(consume())
+
+
+def test_export_memory_stays_flat(server, run):
+    user_id = str(uuid.uuid4())
+    insert_history(server, run, user_id)
+
+    rss_before = server.process_rss_bytes()
+    tracemalloc.start()
+    try:
+        size, first = export(server, run, user_id, compress=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_growth = server.process_rss_bytes() - rss_before
+
+    assert size > 20 * 1024 * 1024
+    assert orjson.loads(first.split(b"\n")[0])["type"] == "session"
+    # Bounded by the cursor batch and chunk size, not by the tens of MB exported
+    assert peak < 16 * 1024 * 1024
+    assert rss_growth < 64 * 1024 * 1024
+
+
+def test_export_gzip_round_trips(server, run):
+    user_id = str(uuid.uuid4())
+    run(server.save_chat_turn(str(uuid.uuid4()), user_id, "I can't sleep", "Let's look at your evenings.", "anxiety"))
+
+    async def collect():
+        return b"".join([chunk async for chunk in server.export_user_history(user_id, compress=True)])
+
+    records = [orjson.loads(line) for line in gzip.decompress(run(collect())).splitlines()]
+    assert [record["type"] for record in records] == ["session", "message", "message"]
+    assert [record["role"] for record in records[1:]] == ["user", "assistant"]
+    assert "user_id" not in records[1]
@@ -0,0 +1,14 @@
+def test_indexes_are_idempotent(server, run):
+    run(server.ensure_indexes())
+    run(server.ensure_indexes())
+
+    for collection_name, indexes in server.DB_INDEXES.items():
+        existing = run(server.db[collection_name].index_information())
+        for index in indexes:
+            assert index.document["name"] in existing
+
+
+def test_every_route_query_uses_an_index(server, run):
+    run(server.ensure_indexes())
+
+    assert run(server.find_unindexed_query_shapes()) == []
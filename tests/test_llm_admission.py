@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def controller(**overrides):
+    settings = {"max_inflight": 1, "max_inflight_per_user": 1, "max_queue": 10, "max_wait": 5}
+    settings.update(overrides)
+    return server.LLMAdmissionController(**settings)
+
+
+async def settle():
+    await asyncio.sleep(0.01)
+
+
+def test_per_user_cap_queues_only_that_user():
+    admission = controller(max_inflight=4)
+
+    async def scenario():
+        release_a = await admission.acquire("a")
+        second_a = asyncio.create_task(admission.acquire("a"))
+        await settle()
+        assert not second_a.done()
+
+        # Another user still goes straight through
+        release_b = await admission.acquire("b")
+        assert admission.stats()["inflight"] == 2
+
+        release_a()
+        await settle()
+        assert second_a.done()
+        (await second_a)()
+        release_b()
+        assert admission.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiters_are_served_round_robin_across_users():
+    admission = controller()
+    granted = []
+
+    async def waiter(name, user_id):
+        release = await admission.acquire(user_id)
+        granted.append((name, release))
+
+    async def scenario():
+        release = await admission.acquire("holder")
+        tasks = []
+        for name, user_id in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b"), ("c1", "c")]:
+            tasks.append(asyncio.create_task(waiter(name, user_id)))
+            await settle()
+        assert admission.stats()["queue_depth"] == 5
+
+        release()
+        while len(granted) < 5:
+            await settle()
+            granted[-1][1]()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert [name for name, _ in granted] == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    admission = controller(max_queue=1)
+
+    async def scenario():
+        release = await admission.acquire("a")
+        queued = asyncio.create_task(admission.acquire("b"))
+        await settle()
+        with pytest.raises(HTTPException) as error:
+            await admission.acquire("c")
+        release()
+        (await queued)()
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+    assert admission.stats()["rejected_queue_full"] == 1
+
+
+def test_wait_timeout_is_rejected_with_retry_after():
+    admission = controller(max_wait=0.05)
+
+    async def scenario():
+        release = await admission.acquire("a")
+        with pytest.raises(HTTPException) as error:
+            await admission.acquire("b")
+        release()
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+    stats = admission.stats()
+    assert stats["rejected_timeout"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["inflight"] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    admission = controller()
+
+    async def scenario():
+        release = await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await settle()
+        waiter.cancel()
+        await settle()
+        assert admission.stats()["queue_depth"] == 0
+        assert admission.stats()["queued_users"] == 0
+
+        release()
+        # Release is idempotent
+        release()
+
+    asyncio.run(scenario())
+    assert admission.stats()["inflight"] == 0
+
+
+def test_slot_granted_to_a_cancelled_waiter_is_released():
+    admission = controller()
+
+    async def scenario():
+        release = await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await settle()
+
+        # The slot is handed over, but the waiter is cancelled before it can resume
+        release()
+        assert admission.stats()["inflight"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(scenario())
+    assert admission.stats()["inflight"] == 0
+    assert admission.stats()["queue_depth"] == 0
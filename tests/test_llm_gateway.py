@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import httpx
+
+import server
+
+
+def test_background_calls_cannot_take_interactive_slots():
+    release_background = asyncio.Event()
+    started = []
+
+    async def handler(request):
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        started.append(prompt)
+        if prompt.startswith("background"):
+            await release_background.wait()
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"re: {prompt}"}}]})
+
+    async def scenario():
+        gateway = server.LLMGateway(
+            api_key="test", model="test", max_concurrency=1, max_background_concurrency=1, pool_size=1, timeout=5
+        )
+        gateway._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        background = [
+            asyncio.create_task(gateway.complete([{"role": "user", "content": f"background {i}"}], background=True))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        # One background call is running and the other waits on the background cap, not the chat one
+        assert started == ["background 0"]
+
+        reply = await asyncio.wait_for(gateway.complete([{"role": "user", "content": "chat"}]), timeout=1)
+        assert reply == "re: chat"
+
+        release_background.set()
+        assert await asyncio.gather(*background) == ["re: background 0", "re: background 1"]
+        await gateway.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+import asyncio
+
+
+def get_metrics(api, token=None):
+    async def scenario():
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with api.client() as client:
+            return await client.get("/api/metrics", headers=headers)
+
+    return asyncio.run(scenario())
+
+
+def test_metrics_are_disabled_without_a_token(api, monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    assert get_metrics(api).status_code == 403
+
+
+def test_metrics_require_the_token(api, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-token")
+
+    assert get_metrics(api).status_code == 401
+    # A user session is not enough
+    assert get_metrics(api, api.user.session_token).status_code == 401
+
+    response = get_metrics(api, "scrape-token")
+    assert response.status_code == 200
+    assert "vimukti_process_pid" in response.text
+    assert "vimukti_background_jobs_" in response.text
@@ -0,0 +1,100 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+START = datetime(2024, 3, 1, 9, 0)
+
+# Three pairs share a timestamp, so ordering within them falls to the id tiebreak
+OFFSETS = [0, 1, 1, 2, 3, 3, 4, 5, 5]
+
+
+def insert_messages(db):
+    messages = [
+        {
+            "id": f"m{i}",
+            "session_id": "s1",
+            "user_id": "u1",
+            "content": f"message {i}",
+            "role": "user",
+            "timestamp": START + timedelta(seconds=offset),
+        }
+        for i, offset in enumerate(OFFSETS)
+    ]
+    asyncio.run(db.chat_messages.insert_many(messages))
+    return [message["id"] for message in messages]
+
+
+def page(db, limit, before=None, after=None, newest_first=False):
+    docs, next_cursor = asyncio.run(server.fetch_page(
+        db.chat_messages, {"session_id": "s1", "user_id": "u1"}, "timestamp", limit, before, after,
+        newest_first=newest_first, projection=server.MESSAGE_VIEW_PROJECTION
+    ))
+    return [doc["id"] for doc in docs], next_cursor
+
+
+def test_paging_back_visits_every_message_once(memory_db):
+    ids = insert_messages(memory_db)
+
+    pages = []
+    items, cursor = page(memory_db, 4)
+    pages.append(items)
+    while cursor:
+        items, cursor = page(memory_db, 4, before=cursor)
+        pages.append(items)
+
+    assert pages == [ids[5:], ids[1:5], ids[:1]]
+
+
+def test_paging_forward_visits_every_message_once(memory_db):
+    ids = insert_messages(memory_db)
+
+    items, cursor = page(memory_db, 2, before=server.encode_cursor(START + timedelta(seconds=1), "m2"))
+    assert items == ["m0", "m1"]
+
+    seen = []
+    cursor = server.encode_cursor(START + timedelta(seconds=1), "m1")
+    while cursor:
+        items, cursor = page(memory_db, 3, after=cursor)
+        seen.extend(items)
+    assert seen == ids[2:]
+
+
+def test_newest_first_pages(memory_db):
+    ids = insert_messages(memory_db)
+
+    first, cursor = page(memory_db, 5, newest_first=True)
+    second, cursor = page(memory_db, 5, before=cursor, newest_first=True)
+
+    assert first + second == ids[::-1]
+    assert cursor is None
+
+
+def test_cursor_round_trips():
+    cursor = server.encode_cursor(START, "m3")
+    assert "=" not in cursor
+    assert server.decode_cursor(cursor) == (START, "m3")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b'["2024-03-01T09:00:00"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", "m1"]').decode(),
+    base64.urlsafe_b64encode(b"null").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_before_and_after_together_is_a_400(memory_db):
+    cursor = server.encode_cursor(START, "m0")
+    with pytest.raises(HTTPException) as error:
+        page(memory_db, 5, before=cursor, after=cursor)
+    assert error.value.status_code == 400
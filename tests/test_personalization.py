@@ -0,0 +1,50 @@
+import asyncio
+
+import server
+
+
+def test_numeric_answers_reach_the_prompt_as_text(api):
+    onboarding = {
+        "user_id": api.user.id,
+        "responses": {"age": 29, "zodiacSign": "Leo", "mbtiType": "INFP"},
+        "personality_archetype": "explorer",
+    }
+
+    async def scenario():
+        async with api.client() as client:
+            assert (await client.post("/api/onboarding", json=onboarding, headers=api.headers)).status_code == 200
+            profile = await client.get("/api/auth/profile", headers=api.headers)
+            chat = await client.post(
+                "/api/chat", json={"session_id": "s1", "message": "hello"}, headers=api.headers
+            )
+        return profile, chat, await server.db.users.find_one({"id": api.user.id})
+
+    profile, chat, stored = asyncio.run(scenario())
+    assert profile.status_code == 200
+    assert profile.json()["age"] == "29"
+    assert "personalization" not in profile.json()
+    assert chat.status_code == 200
+    assert stored["personalization"]["age_bucket"] == "millennial"
+    assert "Millennial" in stored["personalization"]["block"]
+
+
+def test_bad_answers_are_rejected(api):
+    onboarding = {"user_id": api.user.id, "responses": {"age": [29]}, "personality_archetype": "explorer"}
+
+    async def scenario():
+        async with api.client() as client:
+            return await client.post("/api/onboarding", json=onboarding, headers=api.headers)
+
+    assert asyncio.run(scenario()).status_code == 422
+
+
+def test_legacy_values_never_break_the_prompt():
+    user = server.User.model_construct(
+        id="legacy", email="legacy@example.com", name="Legacy", personalization=None,
+        age=29, zodiac_sign=["Leo"], profession=None, personality_type=1234
+    )
+    message = server.create_personalized_system_message(user)
+
+    assert "Millennial" in message
+    assert "Zodiac" not in message and "Personality Type" not in message
+    assert server.compile_personalization(29, {"sign": "Leo"}, 7, None).age_bucket == "millennial"